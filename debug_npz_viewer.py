@@ -1,9 +1,10 @@
 # debug_npz_viewer.py
-import numpy as np
 import matplotlib.pyplot as plt
 import glob
 import os
 
+from src.core.data_prep.processed_slice import ProcessedSlice
+
 
 def check_saved_files():
     # Megkeressük az összes .npz fájlt a processed_data mappában
@@ -22,7 +23,8 @@ def check_saved_files():
     print(f"🔍 Megtekintés: {file_path}")
 
     try:
-        with np.load(file_path) as data:
+        # A kompakt formátum síkjai olvasáskor állnak elő (a régi .npz fájlok is olvashatók)
+        with ProcessedSlice(file_path) as data:
             # Kiírjuk a metaadatokat a konzolba
             print("-" * 30)
             print(f"Páciens ID: {data['patient_id']}")
@@ -1,63 +1,311 @@
-# src/core/data_manager.py
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
 import pydicom
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from src.utils.logger import setup_logger
 from src.core.annotation_handler import AnnotationHandler
+from src.core.data_prep.annotation_store import AnnotationStore
+from src.core.data_prep.dicom_slice import DicomSlice
+from src.core.data_prep.index_cache import IndexCache
+from src.core.data_prep.patient_store import PatientStoreBuilder
+from src.core.data_prep.series_index import SeriesIndex, slice_position
+from src.core.data_prep.slice_table import SliceTable
 
 log = setup_logger("DataManager")
 
 
+def _header_fields(ds):
+    """
+    Az indexben tárolt fejlécmezők kinyerése egy pydicom objektumból.
+
+    Returns:
+        tuple: (sop_uid, patient_id, series_uid, spacing_x, spacing_y, thickness, rows, columns,
+            position, instance_number)
+    """
+    spacing_x, spacing_y = map(float, getattr(ds, 'PixelSpacing', [1.0, 1.0]))
+    instance = getattr(ds, 'InstanceNumber', None)
+    return (
+        str(ds.SOPInstanceUID),
+        str(ds.PatientID) if 'PatientID' in ds else "Ismeretlen",
+        str(getattr(ds, 'SeriesInstanceUID', "")),
+        spacing_x,
+        spacing_y,
+        float(getattr(ds, 'SliceThickness', 0.0) or 0.0),
+        int(getattr(ds, 'Rows', 512)),
+        int(getattr(ds, 'Columns', 512)),
+        slice_position(ds),
+        int(instance) if instance not in (None, "") else 0,
+    )
+
+
+def _read_dicom_chunk(entries):
+    """
+    Egy fájlcsomag DICOM fejléceinek beolvasása (a párhuzamos indexelés munkaegysége).
+
+    Modul szintű függvény, hogy folyamatkészletben (ProcessPoolExecutor) is
+    szerializálható legyen. Ha a fájl mérete és mtime-ja egyezik a cache-elt rekorddal,
+    a fejlécet nem olvassa újra.
+
+    Args:
+        entries (iterable): (útvonal, relatív útvonal, cache-elt rekord vagy None) hármasok.
+    Returns:
+        tuple: (records, errors) – (útvonal, IndexCache rekord, friss-e) hármasok és a
+            hibás fájlok (útvonal, hibaüzenet) listája.
+    """
+    records = []
+    errors = []
+    for f, rel, cached in entries:
+        try:
+            st = os.stat(f)
+            if cached is not None and cached[1] == st.st_size and cached[2] == st.st_mtime_ns:
+                records.append((f, cached, False))
+                continue
+            # Csak a fejléc kell, a pixeladatot nem olvassuk be
+            ds = pydicom.dcmread(f, stop_before_pixels=True)
+            records.append((f, (rel, st.st_size, st.st_mtime_ns) + _header_fields(ds), True))
+        except Exception as e:
+            errors.append((f, str(e)))
+    return records, errors
+
+
 class DataManager:
     """
     A DICOM képek és XML annotációk indexelését és párosítását kezelő osztály.
     UID (SOPInstanceUID) alapú keresést használ a fájlnévfüggetlen párosításhoz.
     """
 
-    def __init__(self, dicom_dir, annotation_dir):
+    def __init__(self, dicom_dir, annotation_dir, workers=1, executor="thread", chunk_size=256,
+                 use_cache=True, cache_path=None):
+        """
+        Args:
+            dicom_dir (str/Path): A DICOM fájlok gyökérmappája.
+            annotation_dir (str/Path): Az XML annotációk gyökérmappája.
+            workers (int): Párhuzamos fejlécolvasók száma. 1 (vagy kisebb) esetén soros indexelés.
+            executor (str): 'thread' (hálózati tárhelyhez, I/O-kötött eset) vagy 'process'.
+            chunk_size (int): Ennyi fájlt kap egy munkás egyszerre a párhuzamos módban.
+            use_cache (bool): Perzisztens fejléc-index használata (csak az új/változott fájlokat olvassa).
+            cache_path (str/Path): Az index helye. Alapértelmezés: <dicom_dir>/.lungdx_index.sqlite
+        """
         self.dicom_dir = Path(dicom_dir)
         self.annotation_dir = Path(annotation_dir)
         self.annot_handler = AnnotationHandler()
 
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Ismeretlen executor típus: {executor} (thread/process)")
+        self.workers = workers
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.use_cache = use_cache
+        self.cache_path = Path(cache_path) if cache_path else self.dicom_dir / ".lungdx_index.sqlite"
+        # A felépített PatientStore és AnnotationStore mentési helye (az index mellett)
+        self.store_path = self.cache_path.parent / ".lungdx_patient_store"
+        self.annotation_store_path = self.cache_path.parent / ".lungdx_annotations"
+        # A sorozatonkénti tüdőmaszkok lemezes cache-e (LSMC.make_lungmask_series)
+        self.lung_mask_path = self.cache_path.parent / ".lungdx_lung_masks"
+        # Memóriatérképezett HU térfogatok sorozatonként (VolumeCache)
+        self.volume_cache_path = self.cache_path.parent / ".lungdx_volumes"
+
         # Hash Map-ek a gyors kereséshez (O(1) komplexitás)
         # Kulcs: SOPInstanceUID (a kép egyedi azonosítója)
         # Érték: Teljes fájl elérési út
         self.dicom_map = {}
         self.xml_map = {}
+        # Az indexelt XML-ek állapota az indexeléskor: {útvonal: (méret, mtime_ns)} (IngestWatcher)
+        self.xml_stats = {}
+
+        # Oszlopos szelet-metaadat tábla (egyetlen fejlécolvasásból)
+        self.slice_table = None
+        # Sorozatonként csoportosított, térbeli sorrendbe rendezett szelet-index
+        self.series_index = None
+        # Közös, egyszer feldolgozott annotációtár (lásd load_annotations)
+        self.annotation_store = None
 
         self.valid_pairs = []  # Lista a (dicom_path, xml_path) párokról
 
-    def index_files(self):
+        # True, ha az utolsó indexelést a should_stop megszakította
+        self.cancelled = False
+
+        # Az utolsó indexelés mérőszámai (fájlszám, idő, fájl/s)
+        self.index_stats = {}
+
+    def index_files(self, progress_callback=None, should_stop=None):
         """
         Végigpásztázza a forrásmappákat, felépíti az indexeket és párosítja a fájlokat.
+
+        Az XML-ek indexelése (csak fájlnevek) megy elől, így a DICOM fejlécek olvasása közben
+        már menet közben számolható a talált párok száma.
+
+        Args:
+            progress_callback (callable): Csomagonként hívódik egy részeredmény szótárral
+                (files, total, pairs, files_per_sec, eta) – pl. a GUI folyamatjelzőjéhez.
+            should_stop (callable): Ha True-t ad vissza, az indexelés a következő csomaghatáron
+                leáll; az addig beolvasott fájlokból épül fel az index (self.cancelled = True).
         """
         log.info("Indexelés indítása...")
-        self._index_dicoms()
+        self.cancelled = False
         self._index_xmls()
+        self._index_dicoms(progress_callback, should_stop)
         self._match_pairs()
-        log.info(f"Indexelés kész. Valid párok száma: {len(self.valid_pairs)}")
+        log.info(f"Indexelés {'megszakítva' if self.cancelled else 'kész'}. "
+                 f"Valid párok száma: {len(self.valid_pairs)}")
 
-    def _index_dicoms(self):
+    def _index_dicoms(self, progress_callback=None, should_stop=None):
         """
         A DICOM fájlok gyors indexelése. Csak a metaadatokat olvassa be (pixeladatok nélkül),
         hogy kinyerje a SOPInstanceUID-t a gyors párosításhoz.
+
+        Az összes szükséges fejlécmezőt (PatientID, SeriesInstanceUID, Rows, Columns, spacing,
+        vastagság) ugyanebben a menetben gyűjti a slice_table-be, így később nincs újraolvasás.
+
+        A perzisztens index (IndexCache) alapján csak az új vagy megváltozott (méret/mtime)
+        fájlok fejlécét olvassa újra, a többi rekord a cache-ből jön. A törölt fájlok
+        rekordjai a futás végén kikerülnek az indexből.
+
+        Párhuzamos módban (workers > 1) a könyvtárbejárás eredményét csomagokban folyamatosan
+        adagolja a munkásoknak, majd a részleges indexeket (shard) beküldési sorrendben fésüli
+        össze, így a dicom_map (és a valid_pairs) sorrendje megegyezik a soros futáséval.
+
+        A teljes fájlszám a bejárás végéig nem ismert; addig a cache előző futásból ismert
+        mérete szolgál becslésként az ETA-hoz. Megszakításkor a friss rekordok bekerülnek a
+        cache-be (a következő futás folytatja), de a törölt fájlok takarítása elmarad.
         """
-        files = list(self.dicom_dir.rglob("*.dcm"))
-        log.info(f"DICOM fájlok keresése: {len(files)} db talált fájl.")
+        self.dicom_map = {}
+        cache = self._open_cache()
+        cached = cache.load() if cache is not None else {}
+        walk = {"count": 0, "done": False}
+        entries = self._iter_entries(cached, walk)
+        parallel = self.workers is not None and self.workers > 1
+        log.info(f"DICOM fájlok indexelése ({f'{self.executor}, {self.workers} munkás' if parallel else 'soros'}, "
+                 f"{len(cached)} cache-elt rekord)...")
 
-        for f in files:
+        start = time.perf_counter()
+        count = 0
+        seen = set()
+        fresh = []
+        paths = []
+        table_records = []
+        pairs = 0
+        chunks = self._read_parallel(entries) if parallel else self._read_serial(entries)
+        for records, errors in chunks:
+            count += len(records) + len(errors)
+            for f, record, is_fresh in records:
+                # record[3]: SOPInstanceUID
+                if record[3] not in self.dicom_map and record[3] in self.xml_map:
+                    pairs += 1
+                self.dicom_map[record[3]] = f
+                paths.append(f)
+                table_records.append(record)
+                seen.add(record[0])
+                if is_fresh:
+                    fresh.append(record)
+            for f, e in errors:
+                log.warning(f"Hibás DICOM fájl kihagyva: {Path(f).name} ({e})")
+
+            if progress_callback is not None:
+                elapsed = time.perf_counter() - start
+                rate = count / elapsed if elapsed > 0 else 0.0
+                total = walk["count"] if walk["done"] else max(walk["count"], len(cached))
+                progress_callback({
+                    "files": count,
+                    "total": total,
+                    "total_known": walk["done"],
+                    "pairs": pairs,
+                    "files_per_sec": rate,
+                    "eta": (total - count) / rate if rate > 0 and total >= count else None,
+                })
+            if should_stop is not None and should_stop():
+                self.cancelled = True
+                log.info(f"DICOM indexelés megszakítva {count} fájl után.")
+                chunks.close()
+                break
+
+        self.slice_table = SliceTable.from_records(paths, table_records)
+        self.series_index = SeriesIndex.from_table(self.slice_table)
+
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        self.index_stats = {"files": count, "seconds": elapsed, "files_per_sec": rate,
+                            "header_reads": len(fresh)}
+        log.info(f"DICOM fájlok: {count} db ({len(fresh)} fejléc újraolvasva), "
+                 f"{elapsed:.1f} s alatt ({rate:.0f} fájl/s).")
+
+        if cache is not None:
             try:
-                # 1. Próbáljuk a modern, gyors módszerrel
-                try:
-                    ds = pydicom.dcmread(f, stop_before_pixel_data=True)
-                except TypeError:
-                    # 2. Ha régi a pydicom, olvassuk be hagyományosan (ez lassabb lesz!)
-                    ds = pydicom.dcmread(f)
-
-                # SOPInstanceUID: Ez a globálisan egyedi azonosítója a szeletnek
-                uid = str(ds.SOPInstanceUID)
-                self.dicom_map[uid] = f
-            except Exception as e:
-                log.warning(f"Hibás DICOM fájl kihagyva: {f.name} ({e})")
+                cache.update(fresh)
+                if not self.cancelled:
+                    cache.prune([p for p in cached if p not in seen])
+            except sqlite3.Error as e:
+                log.warning(f"Az index cache frissítése sikertelen: {e}")
+            finally:
+                cache.close()
+
+    def _iter_entries(self, cached, walk):
+        """
+        A DICOM fa lusta bejárása: (útvonal, relatív útvonal, cache-elt rekord) hármasokat ad.
+        A walk szótárban követi a bejárt fájlok számát és a bejárás végét.
+        """
+        for f in self.dicom_dir.rglob("*.dcm"):
+            rel = f.relative_to(self.dicom_dir).as_posix()
+            walk["count"] += 1
+            yield f, rel, cached.get(rel)
+        walk["done"] = True
+
+    def _read_serial(self, entries):
+        """Soros olvasás csomagonként, hogy a folyamatjelzés és a megszakítás itt is működjön."""
+        entries = iter(entries)
+        while True:
+            chunk = list(islice(entries, self.chunk_size))
+            if not chunk:
+                return
+            yield _read_dicom_chunk(chunk)
+
+    def _open_cache(self):
+        """
+        Megnyitja a perzisztens indexet. Ha a hely nem írható (pl. csak olvasható hálózati
+        meghajtó), figyelmeztet és cache nélkül folytatja.
+        """
+        if not self.use_cache:
+            return None
+        try:
+            return IndexCache(self.cache_path)
+        except (sqlite3.Error, OSError) as e:
+            log.warning(f"Index cache nem elérhető ({self.cache_path}): {e}")
+            return None
+
+    def _read_parallel(self, entries):
+        """
+        A fájlfolyamot csomagokra bontja és a munkáskészletnek adja.
+
+        Egyszerre legfeljebb workers * 4 csomag van úton, így hatalmas fák esetén sem
+        épül fel a teljes fájllista a memóriában.
+
+        Yields:
+            tuple: (records, errors) csomagonként, beküldési sorrendben.
+        """
+        pool_cls = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+        entries = iter(entries)
+        with pool_cls(max_workers=self.workers) as pool:
+            pending = deque()
+            try:
+                while True:
+                    chunk = list(islice(entries, self.chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(_read_dicom_chunk, chunk))
+                    if len(pending) >= self.workers * 4:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # Megszakításkor a még el nem kezdett csomagokat eldobjuk
+                for future in pending:
+                    future.cancel()
 
     def _index_xmls(self):
         """XML fájlok indexelése."""
@@ -69,6 +317,85 @@ class DataManager:
             # pl. 1.3.6.1.4....xml -> UID: 1.3.6.1.4...
             uid = f.stem
             self.xml_map[uid] = f
+            try:
+                st = f.stat()
+                self.xml_stats[str(f)] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+
+    def update_files(self, dicom_files=(), xml_files=()):
+        """
+        Inkrementális frissítés csak a megadott (új vagy megváltozott) fájlokra.
+
+        Csak ezeknek a DICOM-oknak olvassa a fejlécét, frissíti a slice_table-t (egy újraírt fájl
+        régi sora kicserélődik, megváltozott UID esetén a régi UID a dicom_map-ből is kikerül) és a
+        perzisztens indexet, frissíti az XML indexet, majd újrapárosít. A figyelő mód
+        (IngestWatcher) használja.
+
+        Args:
+            dicom_files (iterable): Új vagy megváltozott DICOM fájlok.
+            xml_files (iterable): Új vagy megváltozott XML fájlok.
+        Returns:
+            list: Azok a (dicom_path, xml_path) párok, amelyeket a változás érintett.
+        """
+        affected = set()
+        entries = [(Path(f), Path(f).relative_to(self.dicom_dir).as_posix(), None) for f in dicom_files]
+        records, errors = _read_dicom_chunk(entries)
+        for f, e in errors:
+            log.warning(f"Hibás DICOM fájl kihagyva: {Path(f).name} ({e})")
+
+        if records:
+            if self.slice_table is not None:
+                # Az újraírt fájlok régi UID-jai (ha a fájl UID-ja megváltozott, a régi bejegyzés elavult)
+                rewritten = {str(f) for f, _, _ in records}
+                for path, uid in zip(self.slice_table.paths, self.slice_table.uids):
+                    if path in rewritten and str(self.dicom_map.get(uid)) == path:
+                        del self.dicom_map[uid]
+            for f, record, _ in records:
+                self.dicom_map[record[3]] = f
+                affected.add(record[3])
+            paths = [f for f, _, _ in records]
+            fresh = [record for _, record, _ in records]
+            if self.slice_table is None:
+                self.slice_table = SliceTable.from_records(paths, fresh)
+            else:
+                self.slice_table = self.slice_table.extend(paths, fresh)
+            self.series_index = SeriesIndex.from_table(self.slice_table)
+
+            cache = self._open_cache()
+            if cache is not None:
+                try:
+                    cache.update(fresh)
+                except sqlite3.Error as e:
+                    log.warning(f"Az index cache frissítése sikertelen: {e}")
+                finally:
+                    cache.close()
+
+        for f in xml_files:
+            f = Path(f)
+            self.xml_map[f.stem] = f
+            affected.add(f.stem)
+            try:
+                st = f.stat()
+                self.xml_stats[str(f)] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+
+        self._match_pairs()
+        return [(self.dicom_map[uid], self.xml_map[uid]) for uid in affected
+                if uid in self.dicom_map and uid in self.xml_map]
+
+    def file_states(self):
+        """
+        Az indexelt DICOM és XML fájlok állapota az indexeléskor ({útvonal: (méret, mtime_ns)}).
+
+        A figyelő mód kiinduló állapota: ami azóta változott vagy érkezett, az új fájlnak számít.
+        """
+        state = dict(self.xml_stats)
+        if self.slice_table is not None:
+            for path, size, mtime_ns in zip(self.slice_table.paths, self.slice_table.sizes, self.slice_table.mtimes):
+                state[path] = (int(size), int(mtime_ns))
+        return state
 
     def _match_pairs(self):
         """
@@ -89,32 +416,246 @@ class DataManager:
                 # Olyan DICOM, aminek nincs annotációja (ez gyakori, nem hiba)
                 pass
 
-    def get_data_generator(self):
+    def pairs_signature(self):
+        """
+        A valid párok ujjlenyomata (útvonalak, DICOM méretek és mtime-ok).
+
+        Ha egyezik egy korábban mentett PatientStore ujjlenyomatával, a tár újraépítés
+        nélkül, memóriatérképezéssel betölthető. Az XML-ek változását az AnnotationStore
+        saját ujjlenyomata követi.
+
+        Returns:
+            str: SHA-1 hexadecimális kivonat.
+        """
+        digest = hashlib.sha1()
+        for dicom_path, xml_path in self.valid_pairs:
+            row = self.slice_table.row_of(Path(xml_path).stem)
+            digest.update(f"{dicom_path}|{self.slice_table.sizes[row]}|{self.slice_table.mtimes[row]}|"
+                          f"{xml_path}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def load_annotations(self):
+        """
+        A valid párok annotációinak betöltése a közös AnnotationStore-ba.
+
+        Minden XML-t egyszer dolgoz fel; az eredményt az index mellé menti, és ha az XML-ek
+        (útvonal, méret, mtime) nem változtak, a következő futás újraértelmezés nélkül,
+        memóriatérképezve tölti vissza.
+
+        Returns:
+            AnnotationStore: A párokhoz tartozó annotációk.
+        """
+        items = [(Path(xml_path).stem, xml_path) for _, xml_path in self.valid_pairs]
+        digest = hashlib.sha1()
+        for uid, xml_path in items:
+            st = os.stat(xml_path)
+            digest.update(f"{uid}|{xml_path}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        signature = digest.hexdigest()
+
+        if self.annotation_store is not None and self.annotation_store.signature == signature:
+            return self.annotation_store
+
+        store = None
+        if self.use_cache:
+            try:
+                store = AnnotationStore.load(self.annotation_store_path)
+            except Exception as e:
+                log.warning(f"A mentett annotációtár nem olvasható: {e}")
+
+        if store is None or store.signature != signature:
+            # A régi (memóriatérképezett) tárat elengedjük, mielőtt felülírnánk a fájljait
+            store = None
+            start = time.perf_counter()
+            store = AnnotationStore.build(items, signature=signature,
+                                          workers=self.workers or 1, executor=self.executor)
+            log.info(f"Annotációtár felépítve: {len(store)} XML, {len(store.boxes)} objektum, "
+                     f"{time.perf_counter() - start:.1f} s alatt.")
+            if self.use_cache:
+                try:
+                    store.save(self.annotation_store_path)
+                except OSError as e:
+                    log.warning(f"Az annotációtár mentése sikertelen: {e}")
+        else:
+            log.info(f"Annotációtár betöltve a cache-ből: {len(store)} XML.")
+
+        self.annotation_store = store
+        return store
+
+    def build_patient_store(self, pairs, annotation_store, signature=None, progress_callback=None,
+                            error_callback=None):
+        """
+        PatientStore építése a megadott párokból a slice_table és egy AnnotationStore alapján.
+
+        Args:
+            pairs (list): (dicom_path, xml_path) párok.
+            annotation_store (AnnotationStore): A párok annotációi.
+            signature (str): Opcionális ujjlenyomat a mentéshez.
+            progress_callback (callable): progress_callback(kész, összes, patient_id, dicom_path)
+                minden pár után (opcionális).
+            error_callback (callable): Ha meg van adva, a hibás pár kimarad, és
+                error_callback(dicom_path, kivétel) hívódik; különben a kivétel továbbterjed.
+        Returns:
+            PatientStore: A felépített tár.
+        """
+        pairs = list(pairs)
+        builder = PatientStoreBuilder()
+        for i, (dicom_path, xml_path) in enumerate(pairs):
+            patient_id = None
+            try:
+                uid = Path(xml_path).stem
+                row = self.slice_table.row_of(uid)
+                if row is None:
+                    raise KeyError(f"Nincs a fejléc-indexben: {uid}")
+                patient_id = self.slice_table.patient_id(row)
+                builder.add(
+                    patient_id=patient_id,
+                    uid=uid,
+                    path=dicom_path,
+                    xml_path=xml_path,
+                    width=int(self.slice_table.rows[row]),
+                    height=int(self.slice_table.columns[row]),
+                    thickness=float(self.slice_table.thickness[row]),
+                    spacing=self.slice_table.spacing[row]
+                )
+            except Exception as e:
+                if error_callback is None:
+                    raise
+                error_callback(dicom_path, e)
+            if progress_callback:
+                progress_callback(i + 1, len(pairs), patient_id, dicom_path)
+        return builder.build(annotation_store, signature=signature)
+
+    def get_data_generator(self, prefetch=0, batch_size=None, max_prefetch_bytes=256 * 1024 ** 2):
         """
         Python generátor, amely egyesével tölti be a memóriába a képeket és
         annotációkat a tanításhoz vagy feldolgozáshoz.
 
-        Memóriatakarékos megoldás: csak az aktuálisan kért adatpárt tartja a memóriában.
+        Memóriatakarékos megoldás: alapértelmezetten csak az aktuálisan kért adatpárt tartja
+        a memóriában. Az annotációk a közös AnnotationStore-ból jönnek, XML feldolgozás itt már nincs.
+
+        Előolvasó módban (prefetch > 0) egy háttér szálkészlet már a következő párokat dekódolja,
+        amíg a fogyasztó az aktuálissal dolgozik. A folyamatban lévő képek összmérete
+        (max_prefetch_bytes) korlátozza az előreolvasást, nem a darabszám.
+
+        Args:
+            prefetch (int): Előreolvasó szálak száma (0: szinkron betöltés).
+            batch_size (int): Ha meg van adva, kötegeket ad vissza egyes elemek helyett
+                (lásd _batch_items).
+            max_prefetch_bytes (int): Az előreolvasott, még át nem adott képek bájtkerete.
 
         Yields:
             dict: Egy szótár, ami tartalmazza az UID-t, a képtömböt, a boxokat és az osztályokat.
         """
-        for dicom_path, xml_path in self.valid_pairs:
+        annotations = self.load_annotations()
+        if prefetch and prefetch > 0:
+            items = self._prefetch_items(annotations, prefetch, max_prefetch_bytes)
+        else:
+            items = (self._load_pair(d, x, annotations) for d, x in self.valid_pairs)
+        items = (item for item in items if item is not None)
+
+        if batch_size:
+            yield from self._batch_items(items, batch_size)
+        else:
+            yield from items
+
+    def _load_pair(self, dicom_path, xml_path, annotations):
+        """
+        Egy (DICOM, XML) pár betöltése.
+
+        Returns:
+            dict: A generátor eleme, vagy None, ha nincs érvényes box vagy hiba történt.
+        """
+        try:
+            # Itt már betöltjük a teljes képet (a tárolt pixelértékek, másolás nélkül)
+            image = DicomSlice(dicom_path)
+            image_data = image.raw
+
+            # És a maszkokat
+            bboxes, classes = annotations.one_hot(Path(xml_path).stem, self.annot_handler)
+
+            if bboxes is not None:
+                return {
+                    "uid": str(image.ds.SOPInstanceUID),
+                    "image": image_data,
+                    "boxes": bboxes,
+                    "classes": classes,
+                    "dicom_path": dicom_path
+                }
+        except Exception as e:
+            log.error(f"Hiba a pár feldolgozása közben: {dicom_path.name} -> {e}")
+        return None
+
+    def _estimate_bytes(self, xml_path):
+        """Egy dekódolt kép becsült mérete a slice_table alapján (16 bites CT pixelek)."""
+        row = self.slice_table.row_of(Path(xml_path).stem) if self.slice_table is not None else None
+        if row is None:
+            return 512 * 512 * 2
+        return int(self.slice_table.rows[row]) * int(self.slice_table.columns[row]) * 2
+
+    def _prefetch_items(self, annotations, workers, max_bytes):
+        """
+        Korlátos előreolvasás: a párokat beküldési sorrendben adja vissza, miközben a háttérben
+        legfeljebb max_bytes becsült méretű kép dekódolása van folyamatban (legalább egy mindig).
+        """
+        pairs = iter(self.valid_pairs)
+        pending = deque()
+        in_flight = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
             try:
-                # Itt már betöltjük a teljes képet
-                ds = pydicom.dcmread(dicom_path)
-                image_data = ds.pixel_array
-
-                # És a maszkokat
-                bboxes, classes = self.annot_handler.parse_xml(xml_path)
-
-                if bboxes is not None:
-                    yield {
-                        "uid": str(ds.SOPInstanceUID),
-                        "image": image_data,
-                        "boxes": bboxes,
-                        "classes": classes,
-                        "dicom_path": dicom_path
-                    }
-            except Exception as e:
-                log.error(f"Hiba a pár feldolgozása közben: {dicom_path.name} -> {e}")
+                while True:
+                    # Feltöltés a bájtkeretig
+                    for dicom_path, xml_path in pairs:
+                        size = self._estimate_bytes(xml_path)
+                        pending.append((pool.submit(self._load_pair, dicom_path, xml_path, annotations), size))
+                        in_flight += size
+                        if in_flight >= max_bytes:
+                            break
+                    if not pending:
+                        break
+                    future, size = pending.popleft()
+                    in_flight -= size
+                    yield future.result()
+            finally:
+                # Korai leállításnál a még el nem kezdett feladatokat eldobjuk
+                for future, _ in pending:
+                    future.cancel()
+
+    @staticmethod
+    def _batch_items(items, batch_size):
+        """
+        Elemek kötegelése: azonos méretű képekből (B, H, W) tömb, a boxok és osztályok
+        a kötegen belüli legnagyobb boxszámra nullákkal kitöltve.
+
+        Eltérő képméretnél a köteg korábban lezárul, így egy kötegben mindig azonos a H, W.
+
+        Yields:
+            dict: uids, dicom_paths, images (B, H, W), boxes (B, K, 4), classes (B, K, C),
+                num_boxes (B,) – az érvényes boxok száma elemenként.
+        """
+        batch = []
+        for item in items:
+            if batch and (len(batch) == batch_size or item["image"].shape != batch[0]["image"].shape):
+                yield DataManager._stack_batch(batch)
+                batch = []
+            batch.append(item)
+        if batch:
+            yield DataManager._stack_batch(batch)
+
+    @staticmethod
+    def _stack_batch(batch):
+        num_boxes = np.array([len(item["boxes"]) for item in batch], dtype=np.int32)
+        k = int(num_boxes.max())
+        num_classes = batch[0]["classes"].shape[1]
+        boxes = np.zeros((len(batch), k, 4), dtype=np.float32)
+        classes = np.zeros((len(batch), k, num_classes), dtype=np.float32)
+        for i, item in enumerate(batch):
+            boxes[i, :num_boxes[i]] = item["boxes"]
+            classes[i, :num_boxes[i]] = item["classes"]
+        return {
+            "uids": [item["uid"] for item in batch],
+            "dicom_paths": [item["dicom_path"] for item in batch],
+            "images": np.stack([item["image"] for item in batch]),
+            "boxes": boxes,
+            "classes": classes,
+            "num_boxes": num_boxes,
+        }
@@ -1,6 +1,65 @@
 # src/core/data_prep/annotation_parser.py
 import xml.etree.ElementTree as ET
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
+from src.utils.logger import setup_logger
+
+log = setup_logger("AnnotationParser")
+
+# A bndbox koordináta-elemei, a tárolási sorrendben
+_BOX_TAGS = ("xmin", "ymin", "xmax", "ymax")
+
+
+def parse_voc_objects(xml_path, label_map=None):
+    """
+    Egy VOC XML fájl objektumainak gyors kinyerése (name + bndbox).
+
+    A fájlt egyetlen olvasással a memóriába tölti, és a C-gyorsított ET.fromstring-gel
+    értelmezi; a kis annotációs fájloknál ez gyorsabb, mint az eseményenkénti Python
+    visszahívásokkal járó streaming (XMLPullParser) feldolgozás. Szintaktikai hiba esetén
+    üres lista (ok=False); a hibás objektumok (hiányzó név vagy bndbox, nem egész koordináta)
+    egyenként kimaradnak, a fájl többi objektuma megmarad. Minden kihagyott hibás objektum a
+    fájlnévvel és a sorszámával naplózásra kerül (a szűrt módban eldobott ismeretlen címkék és
+    nulla méretű boxok nem hibák, ezek az AnnotationHandler szabályai szerint csendben maradnak ki).
+
+    Args:
+        xml_path (str/Path): Az XML fájl elérési útja.
+        label_map (dict): Ha meg van adva, az AnnotationHandler szabályai szerint szűr:
+            az ismeretlen címkéjű és a nulla/negatív méretű boxokat eldobja.
+    Returns:
+        tuple: ([(name, xmin, ymin, xmax, ymax), ...], ok) – ok=False, ha a fájl hibás.
+    """
+    objects = []
+    try:
+        with open(xml_path, "rb") as f:
+            root = ET.fromstring(f.read())
+    except Exception:
+        return objects, False
+    for index, obj in enumerate(root.findall("object")):
+        try:
+            name = obj.find("name").text
+            if label_map is not None and name not in label_map:
+                continue
+            bbox = obj.find("bndbox")
+            if bbox is None:
+                raise ValueError("hiányzó bndbox")
+            xmin, ymin, xmax, ymax = (int(bbox.find(tag).text) for tag in _BOX_TAGS)
+        except (AttributeError, TypeError, ValueError) as e:
+            # Hibás objektum: csak ez marad ki, de nyoma marad
+            log.warning(f"Hibás annotációs objektum kihagyva ({xml_path}, {index + 1}. object): {e}")
+            continue
+        # Validálás (szűrt módban): ne legyen negatív vagy 0 méretű
+        if label_map is not None and (xmax <= xmin or ymax <= ymin):
+            continue
+        objects.append((name, xmin, ymin, xmax, ymax))
+    return objects, True
+
+
+def _parse_voc_chunk(paths, label_map):
+    """A kötegelt feldolgozás munkaegysége (modul szintű, hogy folyamatkészletben is futhasson)."""
+    return [parse_voc_objects(p, label_map) for p in paths]
 
 
 class AnnotationParser:
@@ -65,3 +124,41 @@ class AnnotationParser:
             print(f"Hiba az XML olvasásakor ({xml_path}): {e}")
 
         return objects
+
+    @staticmethod
+    def parse_voc_batch(xml_paths, workers=1, executor="thread", chunk_size=256, label_map=None):
+        """
+        Sok kis VOC XML fájl nagy áteresztőképességű, kötegelt feldolgozása.
+
+        A fájlokat csomagokban osztja szét egy szál- vagy folyamatkészlet között
+        (hálózati tárhelynél a szálak az I/O-t, sok CPU-nál a folyamatok az értelmezést
+        párhuzamosítják). Az eredmények sorrendje megegyezik a bemenetével.
+
+        Args:
+            xml_paths (list): Az XML fájlok elérési útjai.
+            workers (int): Munkások száma; 1 esetén soros feldolgozás.
+            executor (str): 'thread' vagy 'process'.
+            chunk_size (int): Egy munkaegységbe kerülő fájlok száma.
+            label_map (dict): Opcionális címkeszűrés (lásd parse_voc_objects).
+
+        Returns:
+            list: Fájlonként egy ([(name, xmin, ymin, xmax, ymax), ...], ok) pár.
+        """
+        if not workers or workers <= 1:
+            return _parse_voc_chunk(xml_paths, label_map)
+
+        pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        results = []
+        paths = iter(xml_paths)
+        with pool_cls(max_workers=workers) as pool:
+            pending = deque()
+            while True:
+                chunk = list(islice(paths, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_parse_voc_chunk, chunk, label_map))
+                if len(pending) >= workers * 4:
+                    results.extend(pending.popleft().result())
+            while pending:
+                results.extend(pending.popleft().result())
+        return results
@@ -0,0 +1,189 @@
+import json
+import numpy as np
+from pathlib import Path
+from src.core.data_prep.annotation_parser import AnnotationParser
+
+
+class AnnotationStore:
+    """
+    Oszlopos annotációtár: minden XML-t egyszer dolgoz fel, a boxokat egybefüggő tömbökben tárolja.
+
+    Egyetlen forrásból szolgálja ki a két eddigi nézetet:
+      - one_hot(): az AnnotationHandler.parse_xml kimenete (float32 boxok + one-hot osztályok),
+        a get_data_generator számára,
+      - objects(): az AnnotationParser.parse_voc_xml kimenete (szótárlista), a PatientStore
+        és a TumorProcessor ROI előkészítése számára.
+
+    Attributes:
+        uids (np.ndarray): A tulajdonos szeletek SOPInstanceUID-jai (bájt).
+        offsets (np.ndarray): (F + 1) int64; az i. UID boxai: offsets[i]:offsets[i + 1].
+        boxes (np.ndarray): (M, 4) int32, [xmin, ymin, xmax, ymax].
+        label_codes (np.ndarray): (M,) int16, a `labels` szótár indexei.
+        owners (np.ndarray): (M,) int32, a box tulajdonos UID-jának sorindexe.
+        labels (np.ndarray): Az előforduló címkék (bájt).
+        null_label (np.ndarray): (1,) int16, a hiányzó (None, üres <name>) címke kódja, vagy -1.
+            A `labels`-ben ez üres szövegként áll, de az objects() None-ként adja vissza, így
+            nem keveredik egy valódi üres címkével.
+        ok (np.ndarray): (F,) bool, False, ha az XML hibás volt.
+    """
+
+    # A lemezes formátum verziója (eltérő verziójú mentés nem töltődik be, újraépül)
+    VERSION = 2
+
+    ARRAYS = ("uids", "offsets", "boxes", "label_codes", "owners", "labels", "null_label", "ok")
+
+    def __init__(self, arrays, signature=None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.signature = signature
+        self._null_code = int(self.null_label[0])
+        self._uid_index = {u.decode("utf-8"): i for i, u in enumerate(self.uids)}
+        self._label_lut = {}
+
+    @classmethod
+    def build(cls, xml_items, signature=None, workers=1, executor="thread"):
+        """
+        A tár felépítése XML fájlokból (fájlonként egyetlen feldolgozás).
+
+        Args:
+            xml_items (list): (uid, xml_path) párok.
+            signature (str): A forrásfájlok ujjlenyomata.
+            workers (int): Párhuzamos XML olvasók száma (lásd AnnotationParser.parse_voc_batch).
+            executor (str): 'thread' vagy 'process'.
+        Returns:
+            AnnotationStore: A felépített tár.
+        """
+        uids, counts, ok, boxes, codes = [], [], [], [], []
+        labels = {}
+        parsed = AnnotationParser.parse_voc_batch([xml_path for _, xml_path in xml_items],
+                                                  workers=workers, executor=executor)
+        for (uid, _), (objects, valid) in zip(xml_items, parsed):
+            uids.append(uid.encode("utf-8"))
+            counts.append(len(objects))
+            ok.append(valid)
+            for name, xmin, ymin, xmax, ymax in objects:
+                boxes.append((xmin, ymin, xmax, ymax))
+                code = labels.get(name)
+                if code is None:
+                    code = labels[name] = len(labels)
+                codes.append(code)
+
+        counts = np.asarray(counts, dtype=np.int64)
+        arrays = {
+            "uids": np.array(uids, dtype=np.bytes_),
+            "offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            "boxes": np.asarray(boxes, dtype=np.int32).reshape(-1, 4),
+            "label_codes": np.asarray(codes, dtype=np.int16),
+            "owners": np.repeat(np.arange(len(uids), dtype=np.int32), counts),
+            # None címke (üres <name>) is előfordulhat: üres szöveg, a kódja a null_label-ben
+            "labels": np.array([(name or "").encode("utf-8") for name in labels], dtype=np.bytes_),
+            "null_label": np.array([labels.get(None, -1)], dtype=np.int16),
+            "ok": np.asarray(ok, dtype=bool),
+        }
+        return cls(arrays, signature=signature)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __contains__(self, uid):
+        return uid in self._uid_index
+
+    def row_of(self, uid):
+        """Egy UID sorindexe, vagy None."""
+        return self._uid_index.get(uid)
+
+    def count(self, uid):
+        """Az UID-hoz tartozó (nyers) objektumok száma."""
+        i = self._uid_index.get(uid)
+        return 0 if i is None else int(self.offsets[i + 1] - self.offsets[i])
+
+    def objects(self, uid):
+        """
+        ROI nézet: az AnnotationParser.parse_voc_xml kimenetével azonos szótárlista.
+        """
+        i = self._uid_index.get(uid)
+        if i is None:
+            return []
+        result = []
+        for k in range(int(self.offsets[i]), int(self.offsets[i + 1])):
+            xmin, ymin, xmax, ymax = (int(v) for v in self.boxes[k])
+            code = int(self.label_codes[k])
+            result.append({
+                "label": None if code == self._null_code else self.labels[code].decode("utf-8"),
+                "bbox": (xmin, ymin, xmax, ymax),
+                "center": ((xmin + xmax) / 2, (ymin + ymax) / 2),
+                "area": (xmax - xmin) * (ymax - ymin)
+            })
+        return result
+
+    def one_hot(self, uid, handler):
+        """
+        Tanítási nézet: az AnnotationHandler.parse_xml kimenetével azonos tömbök.
+
+        Az ismeretlen címkéket és a nulla/negatív méretű boxokat kiszűri.
+
+        Args:
+            uid (str): A szelet SOPInstanceUID-ja.
+            handler (AnnotationHandler): A címke -> osztályindex leképezés forrása.
+        Returns:
+            tuple: (boxok (K, 4) float32, one-hot osztályok (K, C) float32) vagy (None, None).
+        Raises:
+            ValueError: Ha az XML hibás volt.
+        """
+        i = self._uid_index.get(uid)
+        if i is None:
+            return None, None
+        if not self.ok[i]:
+            raise ValueError(f"Hibás XML formátum: {uid}")
+
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        boxes = np.asarray(self.boxes[start:end])
+        classes = self._class_lut(handler)[self.label_codes[start:end]]
+        keep = (classes >= 0) & (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        if not keep.any():
+            return None, None
+        one_hot = np.eye(handler.num_classes, dtype=np.float32)[classes[keep]]
+        return boxes[keep].astype(np.float32), one_hot
+
+    def _class_lut(self, handler):
+        """Címke kód -> osztályindex (-1: ismeretlen) keresőtábla, handlerenként cache-elve."""
+        key = (id(handler), tuple(sorted(handler.label_map.items())))
+        lut = self._label_lut.get(key)
+        if lut is None:
+            lut = np.array([handler.label_map.get(l.decode("utf-8"), -1) for l in self.labels] or [-1],
+                           dtype=np.int64)
+            if self._null_code >= 0:
+                lut[self._null_code] = -1
+            self._label_lut[key] = lut
+        return lut
+
+    # --- Szerializálás ---
+
+    def save(self, directory):
+        """Mentés oszloponként .npy fájlokba és egy meta.json leíróba."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", np.asarray(getattr(self, name)))
+        with open(directory / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "signature": self.signature, "files": len(self)}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Mentett tár betöltése (alapértelmezetten memóriatérképezve).
+
+        Returns:
+            AnnotationStore: A betöltött tár, vagy None, ha nincs (ismert verziójú) mentés.
+        """
+        directory = Path(directory)
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != cls.VERSION:
+            return None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+                  for name in cls.ARRAYS}
+        return cls(arrays, signature=meta.get("signature"))
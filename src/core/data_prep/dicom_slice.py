@@ -0,0 +1,122 @@
+import numpy as np
+import pydicom
+import SimpleITK as sitk
+
+
+def rescale_params(scans):
+    """Szeletenkénti (slope, intercept) tömbök a pydicom fejlécekből."""
+    slopes = np.array([float(getattr(s, 'RescaleSlope', 1) or 1) for s in scans], dtype=np.float64)
+    intercepts = np.array([float(getattr(s, 'RescaleIntercept', 0) or 0) for s in scans], dtype=np.float64)
+    return slopes, intercepts
+
+
+def rescale_to_hu(volume, slopes, intercepts):
+    """
+    Helyben végzett HU konverzió egy (N, H, W) int16 térfogaton, szeletenkénti paraméterekkel.
+
+    Egész slope esetén tisztán int16 aritmetika, egyébként float32 (nincs float64 köztes tömb).
+    """
+    # Since the scanning equipment is cylindrical in nature and image output is square,
+    # we set the out-of-scan pixels to 0
+    volume[volume == -2000] = 0
+
+    scaled = np.flatnonzero(slopes != 1)
+    if len(scaled):
+        factors = slopes[scaled]
+        if np.all(factors == np.round(factors)):
+            volume[scaled] *= factors.astype(np.int16)[:, None, None]
+        else:
+            volume[scaled] = (volume[scaled] * factors.astype(np.float32)[:, None, None]).astype(np.int16)
+
+    volume += intercepts.astype(np.int16)[:, None, None]
+    return volume
+
+
+class DicomSlice:
+    """
+    Egy DICOM szelet lusta betöltője: csak a ténylegesen kért kimenetet állítja elő.
+
+    A fájl az első hozzáféréskor nyílik meg; a nyers pixeltömb, a float32 kép, a HU kép és a
+    SimpleITK kép külön-külön, első használatkor készül el, és ahol nincs szükség konverzióra,
+    nem másol. A LungSegmenter.load_file, az LSMC és a DataManager közösen használja.
+    """
+
+    # RGB -> szürkeárnyalat súlyok
+    GRAY_WEIGHTS = [0.2989, 0.5870, 0.1140]
+
+    def __init__(self, path, volume_cache=None):
+        """
+        Args:
+            path (str/Path): A DICOM fájl elérési útja.
+            volume_cache (VolumeCache): Ha meg van adva, a HU képet elsőként innen olvassa
+                (másolás nélkül, DICOM dekódolás nélkül).
+        """
+        self.path = path
+        self.volume_cache = volume_cache
+        self._ds = None
+        self._pixels = None
+        self._sitk = None
+
+    @property
+    def ds(self):
+        """A pydicom objektum (első hozzáféréskor olvassa be)."""
+        if self._ds is None:
+            # force=True szükséges lehet, ha a fájl nem teljesen szabványos
+            self._ds = pydicom.dcmread(str(self.path), force=True)
+        return self._ds
+
+    @property
+    def raw(self):
+        """A dekódolt, tárolt pixelértékek (a pydicom tömbje, másolás nélkül)."""
+        return self.ds.pixel_array
+
+    @property
+    def pixels(self):
+        """
+        A kép lebegőpontos, kétdimenziós alakban (a régi load_file img_array kimenete):
+        float32 (RGB esetén szürkeárnyalatos float64), a fölösleges dimenziók nélkül.
+        """
+        if self._pixels is None:
+            image = self.raw.astype(np.float32, copy=False)
+            if image.ndim == 3 and image.shape[-1] == 3:
+                image = np.dot(image[..., :3], self.GRAY_WEIGHTS)
+            self._pixels = np.squeeze(image)
+        return self._pixels
+
+    def hu(self, dtype=np.int16):
+        """
+        A kép Hounsfield-egységekben (az LSMC.get_pixels_hu konverziójával azonos).
+
+        Args:
+            dtype: A kimenet típusa; int16 esetén térfogat-cache találatnál másolás nélküli nézet.
+        Returns:
+            numpy.ndarray: (H, W) HU kép.
+        """
+        image = self.volume_cache.slice_of(self.path) if self.volume_cache is not None else None
+        if image is None:
+            image = rescale_to_hu(self.raw.astype(np.int16)[None], *rescale_params([self.ds]))[0]
+        return image.astype(dtype, copy=False)
+
+    @property
+    def spacing(self):
+        """(x, y, z) voxeltávolság; a z többlépcsős fallbackkel (SliceThickness, SpacingBetweenSlices)."""
+        spacing_x, spacing_y = (1.0, 1.0)
+        if "PixelSpacing" in self.ds:
+            spacing_x, spacing_y = map(float, self.ds.PixelSpacing)
+        spacing_z = float(getattr(self.ds, "SliceThickness",
+                                  getattr(self.ds, "SpacingBetweenSlices", 1.0)))
+        if spacing_z <= 0: spacing_z = 1.0
+        return spacing_x, spacing_y, spacing_z
+
+    @property
+    def sitk(self):
+        """SimpleITK kép a voxeltávolsággal (csak első hozzáféréskor épül fel)."""
+        if self._sitk is None:
+            self._sitk = sitk.GetImageFromArray(self.pixels)
+            self._sitk.SetSpacing(self.spacing)
+        return self._sitk
+
+    @property
+    def shape(self):
+        """(magasság, szélesség)."""
+        return self.pixels.shape[-2], self.pixels.shape[-1]
@@ -0,0 +1,63 @@
+import sqlite3
+from pathlib import Path
+
+
+class IndexCache:
+    """
+    Perzisztens, inkrementális DICOM fejléc-index (SQLite) a DataManager számára.
+
+    Minden rekord kulcsa a fájl relatív útvonala, mérete és módosítási ideje (mtime).
+    Ha ezek változatlanok, a fejlécet nem kell újraolvasni: a SOPInstanceUID,
+    PatientID, SeriesInstanceUID, pixeltávolság, szeletvastagság, valamint a sorozaton belüli
+    rendezéshez szükséges pozíció és InstanceNumber a cache-ből jön.
+
+    Egy rekord (tuple) oszlopainak sorrendje megegyezik a COLUMNS tartalmával.
+    """
+
+    COLUMNS = ("path", "size", "mtime_ns", "sop_uid", "patient_id", "series_uid",
+               "spacing_x", "spacing_y", "thickness", "rows", "columns", "position", "instance_number")
+    # Sémaváltozáskor növelni kell: a régi index ilyenkor eldobásra kerül és újraépül
+    SCHEMA_VERSION = 3
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str/Path): Az SQLite adatbázis fájl elérési útja (pl. az adatok mellett).
+        """
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS dicom_index")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dicom_index ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sop_uid TEXT, patient_id TEXT, "
+            "series_uid TEXT, spacing_x REAL, spacing_y REAL, thickness REAL, rows INTEGER, columns INTEGER, "
+            "position REAL, instance_number INTEGER)"
+        )
+        self.conn.commit()
+
+    def load(self):
+        """
+        A teljes index betöltése a memóriába egyetlen lekérdezéssel.
+
+        Returns:
+            dict: {relatív útvonal: rekord tuple}
+        """
+        cursor = self.conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM dicom_index")
+        return {row[0]: row for row in cursor}
+
+    def update(self, records):
+        """Új vagy megváltozott rekordok beszúrása / felülírása egy tranzakcióban."""
+        placeholders = ", ".join("?" * len(self.COLUMNS))
+        with self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO dicom_index VALUES ({placeholders})", records)
+
+    def prune(self, stale_paths):
+        """A már nem létező fájlok rekordjainak törlése."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM dicom_index WHERE path = ?", [(p,) for p in stale_paths])
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,270 @@
+import json
+import os
+import shutil
+import numpy as np
+from pathlib import Path
+
+
+def _encode(values):
+    """Szöveglista -> fix szélességű UTF-8 bájttömb (memóriatérképezhető, nem pickle)."""
+    return np.array([v.encode("utf-8") for v in values], dtype=np.bytes_)
+
+
+class SliceRecord:
+    """
+    Egy szelet könnyűsúlyú nézete a PatientStore-ban.
+
+    Szótárszerű interfészt ad (rec['path'], rec.get('has_tumor')), így a régi,
+    szótár alapú patient_store-t használó kód (TumorProcessor, GUI workerek)
+    változtatás nélkül működik vele. Maga nem tárol adatot, csak a sor indexét.
+    """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.store.field(self.row, key)
+
+    def __contains__(self, key):
+        return key in PatientStore.FIELDS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return PatientStore.FIELDS
+
+    def to_dict(self):
+        """A régi formátumú szelet-szótár előállítása (pl. hibakereséshez)."""
+        return {key: self[key] for key in PatientStore.FIELDS}
+
+
+class PatientStore:
+    """
+    Kompakt, szerializálható páciens-szelet tár (struct-of-arrays).
+
+    A korábbi {patient_id: [szelet-szótár, ...]} szerkezetet váltja ki: a szeletek
+    páciensenként csoportosítva, egymás után következő sorokban állnak, a páciens-
+    azonosítók és könyvtárak egész kódokként (interning) tárolódnak. Az annotációkat
+    nem másolja: a közös AnnotationStore-ból olvassa őket UID alapján.
+
+    Keresés páciens és SOPInstanceUID szerint O(1). A tár lemezre menthető
+    (.npy oszlopok + JSON leíró) és memóriatérképezéssel (mmap) tölthető vissza.
+    """
+
+    FIELDS = ("patient_id", "img_name", "path", "xml_path", "width", "height",
+              "annotations", "has_tumor", "thickness", "spacing")
+
+    # A lemezes formátum verziója (eltérő verziójú mentés nem töltődik be, újraépül)
+    VERSION = 1
+
+    # A lemezen tárolt oszlopok
+    ARRAYS = ("patients", "patient_offsets", "uids", "names", "dirs", "dir_codes",
+              "xml_names", "xml_dirs", "xml_dir_codes", "width", "height", "thickness", "spacing")
+
+    def __init__(self, arrays, annotation_store, signature=None):
+        """
+        Args:
+            arrays (dict): Az ARRAYS nevű oszlopok (NumPy tömbök vagy memmap-ek).
+            annotation_store (AnnotationStore): A szeletek annotációinak forrása.
+            signature (str): A forrásadatok ujjlenyomata (érvényesség ellenőrzéséhez).
+        """
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.annotation_store = annotation_store
+        self.signature = signature
+        self._patient_index = {p.decode("utf-8"): i for i, p in enumerate(self.patients)}
+        self._uid_index = None
+
+    # --- Mapping interfész (a régi dict alapú patient_store helyett) ---
+
+    def __len__(self):
+        return len(self.patients)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._patient_index
+
+    def __iter__(self):
+        return iter(self._patient_index)
+
+    def __getitem__(self, patient_id):
+        return self.slices(self._patient_index[patient_id])
+
+    def keys(self):
+        return self._patient_index.keys()
+
+    def items(self):
+        for patient_id, p in self._patient_index.items():
+            yield patient_id, self.slices(p)
+
+    def slices(self, p):
+        """A p. páciens szeleteinek nézetei (SliceRecord lista)."""
+        return [SliceRecord(self, r) for r in range(int(self.patient_offsets[p]), int(self.patient_offsets[p + 1]))]
+
+    @property
+    def num_slices(self):
+        return len(self.uids)
+
+    def by_uid(self, uid):
+        """Szelet keresése SOPInstanceUID alapján (O(1)); None, ha nincs ilyen."""
+        if self._uid_index is None:
+            self._uid_index = {u: r for r, u in enumerate(self.uids)}
+        row = self._uid_index.get(uid.encode("utf-8"))
+        return None if row is None else SliceRecord(self, row)
+
+    # --- Mezők ---
+
+    def field(self, row, key):
+        """Egy szelet adott mezőjének értéke a régi szelet-szótárral azonos típusban."""
+        if key == "patient_id":
+            p = int(np.searchsorted(self.patient_offsets, row, side="right")) - 1
+            return self.patients[p].decode("utf-8")
+        if key == "img_name":
+            return self.names[row].decode("utf-8")
+        if key == "path":
+            return os.path.join(self.dirs[self.dir_codes[row]].decode("utf-8"), self.names[row].decode("utf-8"))
+        if key == "xml_path":
+            return os.path.join(self.xml_dirs[self.xml_dir_codes[row]].decode("utf-8"),
+                                self.xml_names[row].decode("utf-8"))
+        if key == "width":
+            return int(self.width[row])
+        if key == "height":
+            return int(self.height[row])
+        if key == "annotations":
+            return self.annotation_store.objects(self.uids[row].decode("utf-8"))
+        if key == "has_tumor":
+            return self.annotation_store.count(self.uids[row].decode("utf-8")) > 0
+        if key == "thickness":
+            return float(self.thickness[row])
+        if key == "spacing":
+            return self.spacing[row].tolist()
+        raise KeyError(key)
+
+    # --- Szerializálás ---
+
+    def save(self, directory):
+        """
+        A tár mentése egy mappába: oszloponként egy .npy fájl és egy meta.json leíró.
+        Az AnnotationStore-t nem menti, az külön, az index mellett tárolódik.
+
+        Egy ideiglenes mappába ír, majd átnevezéssel cseréli le a régit, így egy félbeszakadt
+        mentés nem marad meg, és a régi fájlok nem íródnak felül helyben. A régi mentést
+        memóriatérképezve olvasó tárat előtte el kell engedni (Windows alatt a megnyitott
+        fájlok nem cserélhetők).
+        """
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        old_dir = directory.with_name(directory.name + ".old")
+        for stale in (tmp_dir, old_dir):
+            shutil.rmtree(stale, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for name in self.ARRAYS:
+            np.save(tmp_dir / f"{name}.npy", np.asarray(getattr(self, name)))
+        with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "signature": self.signature, "slices": self.num_slices}, f)
+        if directory.exists():
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, annotation_store, mmap=True):
+        """
+        Mentett tár betöltése. mmap=True esetén az oszlopok memóriatérképezve nyílnak meg,
+        így a betöltés azonnali és csak a ténylegesen olvasott lapok kerülnek a memóriába.
+
+        Returns:
+            PatientStore: A betöltött tár, vagy None, ha nincs (érvényes, ismert verziójú) mentés.
+        """
+        directory = Path(directory)
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != cls.VERSION:
+            return None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+                  for name in cls.ARRAYS}
+        return cls(arrays, annotation_store, signature=meta.get("signature"))
+
+
+class PatientStoreBuilder:
+    """
+    PatientStore fokozatos felépítése (pl. a BatchWorker ciklusából).
+
+    A szeletek tetszőleges sorrendben érkezhetnek; a build() a pácienseket az első
+    előfordulás sorrendjében, a szeleteket pedig azon belül érkezési sorrendben
+    rendezi – pontosan úgy, ahogy a régi dict alapú patient_store is tárolta őket.
+    """
+
+    def __init__(self):
+        self._patients = {}
+        self._dirs = {}
+        self._xml_dirs = {}
+        self.patient_codes = []
+        self.uids = []
+        self.names = []
+        self.dir_codes = []
+        self.xml_names = []
+        self.xml_dir_codes = []
+        self.width = []
+        self.height = []
+        self.thickness = []
+        self.spacing = []
+
+    @staticmethod
+    def _intern(table, value):
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table)
+        return code
+
+    def add(self, patient_id, uid, path, xml_path, width, height, thickness, spacing):
+        """Egy szelet hozzáadása."""
+        path, xml_path = str(path), str(xml_path)
+        self.patient_codes.append(self._intern(self._patients, patient_id))
+        self.uids.append(uid)
+        self.names.append(os.path.basename(path))
+        self.dir_codes.append(self._intern(self._dirs, os.path.dirname(path)))
+        self.xml_names.append(os.path.basename(xml_path))
+        self.xml_dir_codes.append(self._intern(self._xml_dirs, os.path.dirname(xml_path)))
+        self.width.append(width)
+        self.height.append(height)
+        self.thickness.append(thickness)
+        self.spacing.append(spacing)
+
+    def build(self, annotation_store, signature=None):
+        """
+        Args:
+            annotation_store (AnnotationStore): A szeletek annotációinak forrása.
+            signature (str): A forrásadatok ujjlenyomata.
+        Returns:
+            PatientStore: A páciensenként csoportosított, kompakt tár.
+        """
+        codes = np.asarray(self.patient_codes, dtype=np.int32)
+        order = np.argsort(codes, kind="stable")
+
+        arrays = {
+            "patients": _encode(self._patients),
+            "patient_offsets": np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self._patients)))]
+                                              ).astype(np.int64),
+            "uids": _encode(self.uids)[order],
+            "names": _encode(self.names)[order],
+            "dirs": _encode(self._dirs),
+            "dir_codes": np.asarray(self.dir_codes, dtype=np.int32)[order],
+            "xml_names": _encode(self.xml_names)[order],
+            "xml_dirs": _encode(self._xml_dirs),
+            "xml_dir_codes": np.asarray(self.xml_dir_codes, dtype=np.int32)[order],
+            "width": np.asarray(self.width, dtype=np.int32)[order],
+            "height": np.asarray(self.height, dtype=np.int32)[order],
+            "thickness": np.asarray(self.thickness, dtype=np.float64)[order],
+            "spacing": np.asarray(self.spacing, dtype=np.float64).reshape(-1, 2)[order],
+        }
+        return PatientStore(arrays, annotation_store, signature=signature)
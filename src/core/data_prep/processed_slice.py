@@ -0,0 +1,138 @@
+import numpy as np
+
+
+# A kompakt formátum verziója (a régi, négy teljes float32 síkos .npz-ben nincs ilyen kulcs)
+FORMAT_VERSION = 2
+
+# A logikai kulcsok, amelyeket a ProcessedSlice mindkét formátumból kiszolgál
+PLANES = ("original", "parenchyma", "masked_tumor", "inverted_roi")
+KEYS = PLANES + ("label", "patient_id")
+
+
+def _compact_original(image):
+    """A float32 kép veszteségmentesen a legkisebb egész típusban (int16, uint16), ha lehetséges."""
+    for dtype in (np.int16, np.uint16):
+        info = np.iinfo(dtype)
+        if image.min() >= info.min and image.max() <= info.max:
+            compact = image.astype(dtype)
+            if np.array_equal(compact.astype(np.float32).view(np.uint32), image.view(np.uint32)):
+                return compact
+    return image
+
+
+def _crop(mask):
+    """
+    Egy bináris maszk befoglaló téglalapja bitpakolva.
+
+    Returns:
+        tuple: (bitpakolt kivágás, [y, x, magasság, szélesség] int32); üres maszknál nulla méretű doboz.
+    """
+    mask = np.asarray(mask) != 0
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return np.zeros((0, 0), dtype=np.uint8), np.zeros(4, dtype=np.int32)
+    cols = np.flatnonzero(mask.any(axis=0))
+    y, x = rows[0], cols[0]
+    h, w = rows[-1] - y + 1, cols[-1] - x + 1
+    return np.packbits(mask[y:y + h, x:x + w], axis=-1), np.array([y, x, h, w], dtype=np.int32)
+
+
+def save_processed(path, original, label, patient_id, tumor_mask, roi_mask, lung_mask=None):
+    """
+    Egy feldolgozott szelet mentése kompakt .npz formátumban.
+
+    A régi formátum négy teljes float32 síkot tárolt; ebből három csak az eredeti kép és egy
+    bináris maszk szorzata. Itt az eredeti kép egyszer, (ha veszteségmentesen lehet) int16-ként
+    kerül mentésre, a tüdőmaszk bitpakolva, a daganat- és a ROI-maszk pedig bitpakolva, a
+    befoglaló téglalapjukra vágva (eltolással). A síkokat a ProcessedSlice állítja vissza,
+    bitre azonosan a régi formátum tartalmával.
+
+    Args:
+        path (str): A kimeneti .npz fájl.
+        original (numpy.ndarray): (H, W) float32 eredeti kép.
+        label (str): A daganat címkéje.
+        patient_id (str): A páciens azonosítója.
+        tumor_mask (numpy.ndarray): (H, W) maszk, a daganat kontúrján belül nem nulla.
+        roi_mask (numpy.ndarray): (H, W) maszk, a ROI keretén belül, a daganaton kívül nem nulla.
+        lung_mask (numpy.ndarray): (H, W) bool tüdőmaszk, vagy None (ekkor a parenchima csupa nulla).
+    """
+    tumor_bits, tumor_box = _crop(tumor_mask)
+    roi_bits, roi_box = _crop(roi_mask)
+    arrays = dict(format_version=np.int32(FORMAT_VERSION), original=_compact_original(original),
+                  tumor_mask=tumor_bits, tumor_box=tumor_box, roi_mask=roi_bits, roi_box=roi_box,
+                  label=label, patient_id=patient_id)
+    if lung_mask is not None:
+        arrays["lung_mask"] = np.packbits(lung_mask, axis=-1)
+    np.savez_compressed(path, **arrays)
+
+
+class ProcessedSlice:
+    """
+    Egy feldolgozott szelet (.npz) lusta olvasója, a régi és a kompakt formátumhoz egyaránt.
+
+    Szótárszerű: data['original'], data['parenchyma'], data['masked_tumor'], data['inverted_roi'],
+    data['label'], data['patient_id'] – a régi np.load(...) hozzáférésekkel azonos értékekkel.
+    Egy sík csak az első hozzáféréskor áll elő (kompakt formátumban az eredeti képből és a
+    maszkból), a fájl tagjai is csak ekkor tömörítődnek ki. Kontextuskezelőként is használható.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str/Path): A TumorProcessor által írt .npz fájl.
+        """
+        self.path = path
+        self._data = np.load(path)
+        self.compact = "format_version" in self._data.files
+        self._cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._data.close()
+
+    def keys(self):
+        return list(KEYS)
+
+    def __contains__(self, key):
+        return key in KEYS
+
+    def __getitem__(self, key):
+        if key not in KEYS:
+            raise KeyError(key)
+        if not self.compact:
+            return self._data[key]
+        if key not in self._cache:
+            self._cache[key] = self._build(key)
+        return self._cache[key]
+
+    def _mask(self, name):
+        """Egy kivágott, bitpakolt maszk (tumor/roi): (szeletek a teljes képen, bool kivágás)."""
+        y, x, h, w = self._data[f"{name}_box"].tolist()
+        bits = np.unpackbits(self._data[f"{name}_mask"], axis=-1, count=w).astype(bool) if h else None
+        return (slice(y, y + h), slice(x, x + w)), bits
+
+    def _build(self, key):
+        if key in ("label", "patient_id"):
+            return self._data[key]
+        if key == "original":
+            return self._data["original"].astype(np.float32)
+
+        original = self["original"]
+        if key == "parenchyma":
+            if "lung_mask" not in self._data.files:
+                return np.zeros_like(original)
+            lung_mask = np.unpackbits(self._data["lung_mask"], axis=-1, count=original.shape[-1]).astype(bool)
+            return np.multiply(lung_mask, original)
+
+        # A kontúron (ROI-n) belül az eredeti kép, kívül 0
+        name = "tumor" if key == "masked_tumor" else "roi"
+        plane = np.zeros_like(original)
+        window, bits = self._mask(name)
+        if bits is not None:
+            np.copyto(plane[window], original[window], where=bits)
+        return plane
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+
+
+def slice_position(ds):
+    """
+    A szelet helyzete a sorozat normálvektora mentén (mm), a sorozaton belüli rendezéshez.
+
+    Az ImagePositionPatient vetülete a képsík normálisára (ImageOrientationPatient sor- és
+    oszlopvektorának vektoriális szorzata); ennek hiányában a z koordináta, majd a SliceLocation.
+
+    Returns:
+        float: A pozíció, vagy NaN, ha a fejléc nem tartalmaz ilyen adatot.
+    """
+    try:
+        position = np.asarray(ds.ImagePositionPatient, dtype=np.float64)
+        try:
+            orientation = np.asarray(ds.ImageOrientationPatient, dtype=np.float64)
+            return float(np.dot(position, np.cross(orientation[:3], orientation[3:])))
+        except (AttributeError, ValueError, TypeError):
+            return float(position[2])
+    except (AttributeError, ValueError, TypeError, IndexError):
+        pass
+    try:
+        return float(ds.SliceLocation)
+    except (AttributeError, ValueError, TypeError):
+        return float("nan")
+
+
+class SeriesIndex:
+    """
+    Sorozatonként (SeriesInstanceUID) csoportosított szelet-index a SliceTable fölött.
+
+    A szeletek sorozaton belül térbeli sorrendben (ImagePositionPatient a képsík normálisa
+    mentén, ennek hiányában InstanceNumber) egymás után következnek, így egy teljes sorozat
+    egyetlen szekvenciális menetben betölthető, és a betöltött térfogat a sorozat minden
+    annotált szeletéhez újrahasznosítható. A sorozatonkénti voxeltávolság is itt tárolódik.
+
+    A SeriesInstanceUID nélküli szeletek nem kerülnek egyetlen közös sorozatba: a kulcsuk a
+    PatientID és a fájl mappája ("<PatientID>|<mappa>"), így páciensek és mappák nem keverednek.
+
+    Attributes:
+        table (SliceTable): A forrás tábla (a sorindexek erre hivatkoznak).
+        series (np.ndarray): A sorozatok kulcsai: SeriesInstanceUID, ennek hiányában
+            "<PatientID>|<mappa>" (object).
+        offsets (np.ndarray): (S + 1) int64; az i. sorozat szeletei: order[offsets[i]:offsets[i + 1]].
+        order (np.ndarray): A slice_table sorindexei sorozatonként, térbeli sorrendben (int64).
+        spacing (np.ndarray): (S, 3) float64 – [pixeltávolság (PixelSpacing[0], PixelSpacing[1]),
+            szeletköz]. A szeletköz a pozíciókülönbségek mediánja, ennek hiányában a SliceThickness.
+    """
+
+    def __init__(self, table, series, offsets, order, spacing):
+        self.table = table
+        self.series = series
+        self.offsets = offsets
+        self.order = order
+        self.spacing = spacing
+        self._series_index = {uid: i for i, uid in enumerate(series)}
+        # UID -> (sorozat index, pozíció a sorozaton belül)
+        self._slice_index = {}
+        for i in range(len(series)):
+            for k, row in enumerate(order[offsets[i]:offsets[i + 1]]):
+                self._slice_index[table.uids[row]] = (i, k)
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        Az index felépítése egy SliceTable-ből (fájlolvasás nélkül).
+
+        Ismétlődő SOPInstanceUID esetén csak a tábla keresőindexében élő sor számít.
+
+        Args:
+            table (SliceTable): Az indexelés során felépített tábla.
+        Returns:
+            SeriesIndex: A felépített index.
+        """
+        live = np.zeros(len(table), dtype=bool)
+        live[list(table.index.values())] = True
+        rows = np.flatnonzero(live)
+
+        # Sorozatkulcsok: a SeriesInstanceUID nélküli szeletek páciensenként és mappánként
+        keys = table.series[table.series_codes[rows]]
+        missing = keys == ""
+        if missing.any():
+            keys = keys.copy()
+            keys[missing] = [f"{table.patient_id(row)}|{os.path.dirname(table.paths[row])}"
+                             for row in rows[missing]]
+        series, codes = np.unique(keys, return_inverse=True)
+
+        # Rendezés: sorozat, pozíció (NaN a végére), InstanceNumber
+        sort = np.lexsort((table.instance_numbers[rows], table.positions[rows], codes))
+        order, codes = rows[sort], codes[sort]
+        _, starts = np.unique(codes, return_index=True)
+        offsets = np.append(starts, len(order)).astype(np.int64)
+
+        spacing = np.zeros((len(series), 3), dtype=np.float64)
+        for i in range(len(series)):
+            members = order[offsets[i]:offsets[i + 1]]
+            spacing[i, :2] = table.spacing[members[0]]
+            positions = table.positions[members]
+            steps = np.abs(np.diff(positions[np.isfinite(positions)]))
+            steps = steps[steps > 0]
+            spacing[i, 2] = np.median(steps) if len(steps) else np.median(table.thickness[members])
+
+        return cls(table, series, offsets, order.astype(np.int64), spacing)
+
+    def __len__(self):
+        return len(self.series)
+
+    def __contains__(self, series_uid):
+        return series_uid in self._series_index
+
+    def rows(self, series_uid):
+        """A sorozat szeleteinek slice_table sorindexei térbeli sorrendben."""
+        i = self._series_index[series_uid]
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+    def paths(self, series_uid):
+        """A sorozat DICOM fájljai térbeli sorrendben (egy szekvenciális betöltéshez)."""
+        return self.table.paths[self.rows(series_uid)].tolist()
+
+    def spacing_of(self, series_uid):
+        """A sorozat voxeltávolsága: (PixelSpacing[0], PixelSpacing[1], szeletköz)."""
+        return tuple(self.spacing[self._series_index[series_uid]].tolist())
+
+    def locate(self, uid):
+        """
+        Egy szelet helye a sorozatában.
+
+        Returns:
+            tuple: (SeriesInstanceUID, index a sorozaton belül), vagy None, ha nincs ilyen UID.
+        """
+        found = self._slice_index.get(uid)
+        if found is None:
+            return None
+        return self.series[found[0]], found[1]
+
+    def group(self, uids):
+        """
+        Szeletek csoportosítása sorozatonként, hogy minden sorozat csak egyszer töltődjön be.
+
+        Args:
+            uids (iterable): SOPInstanceUID-k (pl. a daganatos szeletek).
+        Returns:
+            dict: {SeriesInstanceUID: [(index a sorozaton belül, uid), ...]} – a sorozatok az
+                index sorrendjében, a szeletek azon belül térbeli sorrendben.
+        """
+        found = sorted((loc, uid) for uid in uids for loc in [self._slice_index.get(uid)] if loc is not None)
+        groups = {}
+        for (i, k), uid in found:
+            groups.setdefault(self.series[i], []).append((k, uid))
+        return groups
@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class SliceTable:
+    """
+    Oszlopos (struct-of-arrays) szelet-metaadat tábla.
+
+    Az indexelés egyetlen fejlécolvasásából épül fel, így a későbbi lépéseknek
+    (BatchWorker, TumorProcessor) már nem kell újra megnyitniuk a DICOM fájlokat.
+    Szótárlista helyett NumPy oszlopokat tárol; a páciens- és sorozatazonosítók
+    egész kódokként (interning) szerepelnek, a szöveges értékek egyszer tárolódnak.
+
+    Attributes:
+        paths (np.ndarray): A DICOM fájlok elérési útjai (object).
+        uids (np.ndarray): SOPInstanceUID-k (object).
+        patient_codes (np.ndarray): Páciens kódok (int32), a `patients` tömb indexei.
+        patients (np.ndarray): Egyedi PatientID értékek (object).
+        series_codes (np.ndarray): Sorozat kódok (int32), a `series` tömb indexei.
+        series (np.ndarray): Egyedi SeriesInstanceUID értékek (object).
+        spacing (np.ndarray): PixelSpacing (N, 2) float64.
+        thickness (np.ndarray): SliceThickness (N,) float64.
+        rows (np.ndarray): Rows (N,) int32.
+        columns (np.ndarray): Columns (N,) int32.
+        sizes (np.ndarray): Fájlméret bájtban (N,) int64.
+        mtimes (np.ndarray): Módosítási idő nanoszekundumban (N,) int64.
+        positions (np.ndarray): Szeletpozíció a sorozat normálisa mentén (N,) float64, NaN ha ismeretlen.
+        instance_numbers (np.ndarray): InstanceNumber (N,) int32.
+    """
+
+    def __init__(self, paths, uids, patient_codes, patients, series_codes, series,
+                 spacing, thickness, rows, columns, sizes, mtimes, positions, instance_numbers):
+        self.paths = paths
+        self.uids = uids
+        self.patient_codes = patient_codes
+        self.patients = patients
+        self.series_codes = series_codes
+        self.series = series
+        self.spacing = spacing
+        self.thickness = thickness
+        self.rows = rows
+        self.columns = columns
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.positions = positions
+        self.instance_numbers = instance_numbers
+
+        # UID -> sorindex (O(1) keresés); ismétlődő UID esetén az utolsó előfordulás nyer,
+        # ugyanúgy, mint a DataManager.dicom_map-ben
+        self.index = {uid: i for i, uid in enumerate(uids)}
+
+    @classmethod
+    def from_records(cls, paths, records):
+        """
+        Tábla építése az indexelés rekordjaiból.
+
+        Args:
+            paths (list): A rekordokhoz tartozó teljes fájlútvonalak.
+            records (list): IndexCache rekordok (lásd IndexCache.COLUMNS).
+        Returns:
+            SliceTable: A felépített tábla.
+        """
+        n = len(records)
+        columns = list(zip(*records)) if n else [()] * 13
+        patients, patient_codes = np.unique(np.array(columns[4], dtype=object), return_inverse=True)
+        series, series_codes = np.unique(np.array(columns[5], dtype=object), return_inverse=True)
+
+        return cls(
+            paths=np.array([str(p) for p in paths], dtype=object),
+            uids=np.array(columns[3], dtype=object),
+            patient_codes=patient_codes.astype(np.int32),
+            patients=patients,
+            series_codes=series_codes.astype(np.int32),
+            series=series,
+            spacing=np.column_stack([np.array(columns[6], dtype=np.float64),
+                                     np.array(columns[7], dtype=np.float64)]),
+            thickness=np.array(columns[8], dtype=np.float64),
+            rows=np.array(columns[9], dtype=np.int32),
+            columns=np.array(columns[10], dtype=np.int32),
+            sizes=np.array(columns[1], dtype=np.int64),
+            mtimes=np.array(columns[2], dtype=np.int64),
+            # Az SQLite a NaN-t NULL-ként tárolja, ez None-ként jön vissza -> NaN
+            positions=np.array(columns[11], dtype=np.float64),
+            instance_numbers=np.array(columns[12], dtype=np.int32),
+        )
+
+    def extend(self, paths, records):
+        """
+        Új rekordok hozzáfűzése (pl. figyelő módban érkezett fájlok).
+
+        Egy már szereplő útvonal (újraírt fájl) régi sora kikerül, az új sor váltja. Ismétlődő
+        UID (más útvonalon) esetén az új sor írja felül a keresőindexet, a régi sor a táblában
+        marad, de már nem érhető el UID alapján.
+
+        Returns:
+            SliceTable: Az összefűzött, újonnan internált tábla.
+        """
+        other = SliceTable.from_records(paths, records)
+        replaced = set(other.paths)
+        keep = np.fromiter((path not in replaced for path in self.paths), dtype=bool, count=len(self))
+        base = self._select(keep) if not keep.all() else self
+        patients, patient_inverse = np.unique(np.concatenate([base.patients, other.patients]), return_inverse=True)
+        series, series_inverse = np.unique(np.concatenate([base.series, other.series]), return_inverse=True)
+        n_p, n_s = len(base.patients), len(base.series)
+        return SliceTable(
+            paths=np.concatenate([base.paths, other.paths]),
+            uids=np.concatenate([base.uids, other.uids]),
+            patient_codes=np.concatenate([patient_inverse[:n_p][base.patient_codes],
+                                          patient_inverse[n_p:][other.patient_codes]]).astype(np.int32),
+            patients=patients,
+            series_codes=np.concatenate([series_inverse[:n_s][base.series_codes],
+                                         series_inverse[n_s:][other.series_codes]]).astype(np.int32),
+            series=series,
+            spacing=np.concatenate([base.spacing, other.spacing]),
+            thickness=np.concatenate([base.thickness, other.thickness]),
+            rows=np.concatenate([base.rows, other.rows]),
+            columns=np.concatenate([base.columns, other.columns]),
+            sizes=np.concatenate([base.sizes, other.sizes]),
+            mtimes=np.concatenate([base.mtimes, other.mtimes]),
+            positions=np.concatenate([base.positions, other.positions]),
+            instance_numbers=np.concatenate([base.instance_numbers, other.instance_numbers]),
+        )
+
+    def _select(self, mask):
+        """A mask szerinti sorok táblája (a páciens- és sorozattáblák változatlanok)."""
+        return SliceTable(self.paths[mask], self.uids[mask], self.patient_codes[mask], self.patients,
+                          self.series_codes[mask], self.series, self.spacing[mask], self.thickness[mask],
+                          self.rows[mask], self.columns[mask], self.sizes[mask], self.mtimes[mask],
+                          self.positions[mask], self.instance_numbers[mask])
+
+    def __len__(self):
+        return len(self.uids)
+
+    def row_of(self, uid):
+        """Egy SOPInstanceUID sorindexe, vagy None, ha nincs a táblában."""
+        return self.index.get(uid)
+
+    def patient_id(self, row):
+        """A megadott sor PatientID értéke."""
+        return self.patients[self.patient_codes[row]]
+
+    def series_uid(self, row):
+        """A megadott sor SeriesInstanceUID értéke."""
+        return self.series[self.series_codes[row]]
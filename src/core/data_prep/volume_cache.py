@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from pathlib import Path
+
+
+class VolumeCache:
+    """
+    Lemezes, memóriatérképezett HU térfogat-cache sorozatonként.
+
+    Minden sorozat egyszer kerül dekódolásra: a HU térfogat nyers int16 .npy fájlba íródik, a
+    leírója (SeriesInstanceUID, voxeltávolság, origó, UID-k, a forrásfájlok ujjlenyomata) pedig
+    a cache egyetlen index.json jegyzékébe. A kulcs a forrásfájlok útvonalából, méretéből és
+    mtime-jából képzett hash, így bármely fájl változása új bejegyzést eredményez; a put() a
+    sorozat korábbi (elavult) bejegyzéseit törli. A cache mérete korlátos (max_bytes): a
+    legrégebben használt térfogatok törlődnek (LRU). Visszaolvasáskor a térfogat
+    memóriatérképezve (mmap) nyílik meg, egy szelet kiolvasása másolás nélküli nézet.
+    """
+
+    VERSION = 2
+    INDEX_NAME = "index.json"
+    # Alapértelmezett méretkorlát (bájt)
+    MAX_BYTES = 4 * 1024 ** 3
+
+    def __init__(self, cache_dir, max_bytes=MAX_BYTES):
+        """
+        Args:
+            cache_dir (str/Path): A cache mappája (pl. <dicom_dir>/.lungdx_volumes).
+            max_bytes (int): A térfogatok együttes méretkorlátja; None esetén korlátlan.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / self.INDEX_NAME
+        # Megnyitott térfogatok: {kulcs: memmap}
+        self._volumes = {}
+        # A jegyzék bejegyzései: {kulcs: leíró (benne "bytes" és "used")}, lustán töltődik be
+        self._entries = None
+        # Szeletenkénti keresés: {útvonal: (kulcs, index, méret, mtime_ns)}, lustán épül fel
+        self._slices = None
+
+    @staticmethod
+    def fingerprint(paths):
+        """A fájlok ujjlenyomata: [útvonal, méret, mtime_ns] listák."""
+        files = []
+        for path in paths:
+            st = os.stat(path)
+            files.append([str(path), st.st_size, st.st_mtime_ns])
+        return files
+
+    def key(self, files, sort=True):
+        """Cache kulcs a fájlok ujjlenyomatából (a betöltés sorrendjét is beleértve)."""
+        digest = hashlib.sha1(f"{self.VERSION}|{int(sort)}".encode("utf-8"))
+        for path, size, mtime_ns in files:
+            digest.update(f"|{path}|{size}|{mtime_ns}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, paths, sort=True):
+        """
+        Egy sorozat térfogata a cache-ből.
+
+        Args:
+            paths (list): A sorozat DICOM fájljai (ugyanabban a sorrendben, mint a put()-nál).
+            sort (bool): A betöltéskor használt rendezés (a kulcs része).
+        Returns:
+            tuple: (memmap (N, H, W) int16, leíró szótár), vagy None, ha nincs érvényes bejegyzés.
+        """
+        key = self.key(self.fingerprint(paths), sort)
+        meta = self._index().get(key)
+        if meta is None:
+            return None
+        volume = self._open(key)
+        if volume is None:
+            return None
+        # Az LRU sorrend a következő put()-tal kerül lemezre
+        meta["used"] = time.time()
+        return volume, meta
+
+    def put(self, paths, volume, info, sort=True):
+        """
+        Egy frissen betöltött sorozat mentése.
+
+        A sorozat fájljaira hivatkozó korábbi bejegyzések (megváltozott ujjlenyomat) törlődnek,
+        majd a méretkorlát túllépésekor a legrégebben használt térfogatok is.
+
+        Args:
+            paths (list): A sorozat DICOM fájljai (a kulcs alapja).
+            volume (numpy.ndarray): (N, H, W) int16 HU térfogat.
+            info (dict): A sorozat leírója (series_uid, uids, paths a térfogat sorrendjében,
+                spacing, origin, positions).
+            sort (bool): A betöltéskor használt rendezés.
+        Returns:
+            tuple: (memmap, leíró) – a mentett, memóriatérképezett térfogat.
+        """
+        key = self.key(self.fingerprint(paths), sort)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Előbb a térfogat, utána a jegyzék: a jegyzékbejegyzés jelzi a kész térfogatot
+        volume = np.ascontiguousarray(volume, dtype=np.int16)
+        tmp_path = self.cache_dir / f"{key}.npy.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, volume)
+        os.replace(tmp_path, self.cache_dir / f"{key}.npy")
+
+        meta = dict(info, version=self.VERSION, shape=list(volume.shape),
+                    files=self.fingerprint(info["paths"]), bytes=volume.nbytes, used=time.time())
+        # Más folyamatok (pl. a TumorProcessor workerei) bejegyzéseinek átvétele
+        entries = self._index(reload=True)
+        sources = {path for path, _, _ in meta["files"]}
+        for stale in [k for k, m in entries.items()
+                      if k != key and any(path in sources for path, _, _ in m.get("files", []))]:
+            self._remove(stale)
+        entries[key] = meta
+        self._evict(keep=key)
+        self._save_index()
+        self._remove_legacy()
+
+        if self._slices is not None:
+            self._register(key, meta)
+        return self._open(key), meta
+
+    def slice_of(self, path):
+        """
+        Egy szelet HU képe egy korábban cache-elt sorozatból (másolás nélküli nézet).
+
+        Returns:
+            numpy.ndarray: (H, W) int16 memmap nézet, vagy None, ha a fájl nincs a cache-ben
+                vagy azóta megváltozott.
+        """
+        if self._slices is None:
+            self._slices = {}
+            for key, meta in self._index().items():
+                self._register(key, meta)
+
+        entry = self._slices.get(str(path))
+        if entry is None:
+            return None
+        key, index, size, mtime_ns = entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != size or st.st_mtime_ns != mtime_ns:
+            return None
+        volume = self._open(key)
+        return None if volume is None else volume[index]
+
+    @property
+    def nbytes(self):
+        """A cache-elt térfogatok együttes mérete a jegyzék szerint."""
+        return sum(meta.get("bytes", 0) for meta in self._index().values())
+
+    def _index(self, reload=False):
+        """A jegyzék bejegyzései (az első használatkor, illetve reload=True esetén a lemezről)."""
+        if self._entries is None or reload:
+            entries = {}
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    entries = data.get("entries", {})
+            except (OSError, ValueError):
+                pass
+            if self._entries is not None:
+                # A memóriában frissebb használati időpontok megmaradnak
+                for key, meta in self._entries.items():
+                    if key in entries:
+                        entries[key]["used"] = max(entries[key].get("used", 0), meta.get("used", 0))
+            self._entries = entries
+        return self._entries
+
+    def _save_index(self):
+        """A jegyzék kiírása atomikus cserével."""
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": self._entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _evict(self, keep=None):
+        """A legrégebben használt térfogatok törlése, amíg a cache a méretkorláton belül nem kerül."""
+        if self.max_bytes is None:
+            return
+        entries = self._index()
+        total = sum(meta.get("bytes", 0) for meta in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get("used", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key].get("bytes", 0)
+            self._remove(key)
+
+    def _remove(self, key):
+        """Egy bejegyzés és térfogatfájljának törlése (a megnyitott memmap elengedésével)."""
+        self._index().pop(key, None)
+        self._volumes.pop(key, None)
+        if self._slices is not None:
+            self._slices = {p: e for p, e in self._slices.items() if e[0] != key}
+        try:
+            (self.cache_dir / f"{key}.npy").unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Windows alatt egy másik folyamatban még megnyitott (mmap) fájl nem törölhető;
+            # a jegyzékből kikerül, így többé nem használjuk
+            pass
+
+    def _remove_legacy(self):
+        """A jegyzék előtti (bejegyzésenkénti .json leírós) formátum maradékainak törlése."""
+        for meta_path in self.cache_dir.glob("*.json"):
+            if meta_path.name == self.INDEX_NAME:
+                continue
+            for path in (self.cache_dir / f"{meta_path.stem}.npy", meta_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _register(self, key, meta):
+        for index, (path, size, mtime_ns) in enumerate(meta.get("files", [])):
+            self._slices[path] = (key, index, size, mtime_ns)
+
+    def _open(self, key):
+        volume = self._volumes.get(key)
+        if volume is None:
+            try:
+                volume = np.load(self.cache_dir / f"{key}.npy", mmap_mode="r")
+            except (OSError, ValueError):
+                return None
+            self._volumes[key] = volume
+        return volume
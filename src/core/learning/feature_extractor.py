@@ -8,6 +8,8 @@ from tqdm import tqdm
 from scipy import ndimage as nd
 from skimage.filters import sobel
 
+from src.core.data_prep.processed_slice import ProcessedSlice
+
 
 class FeatureExtractor:
     """
@@ -16,6 +18,7 @@ class FeatureExtractor:
     Ez az osztály .npz fájlokból olvassa be a szegmentált CT képeket, különböző
     képfeldolgozó szűrőket (Gabor, Sobel, Gauss, stb.) alkalmaz rajtuk pixel-szinten,
     majd az eredményeket egy strukturált pandas DataFrame-be gyűjti össze a gépi tanuláshoz.
+    A fájlokat a ProcessedSlice olvassa (régi és kompakt formátum egyaránt).
 
     Attributes:
         data_dir (str): A feldolgozott (.npz) fájlok forráskönyvtára.
@@ -212,7 +215,7 @@ class FeatureExtractor:
 
         for file_path in tqdm(npz_files, desc="Feldolgozás"):
             try:
-                with np.load(file_path) as data:
+                with ProcessedSlice(file_path) as data:
                     img_original = data['original']
                     img_parenchyma = data['parenchyma']
                     img_tumor = data['masked_tumor']
@@ -1,8 +1,43 @@
 # src/core/lsmc.py
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pydicom
 from scipy import ndimage
-from skimage import measure, segmentation
+from skimage import segmentation
+from src.core.data_prep.dicom_slice import DicomSlice, rescale_params, rescale_to_hu
+from src.core.data_prep.series_index import slice_position
+from src.core.segmentation import multires
+
+
+class SeriesMasks:
+    """
+    Egy sorozat tüdőmaszkjai bitre tömörítve (np.packbits a sorok mentén, 1 bit/voxel).
+
+    A maszkok a sorozat betöltési sorrendjében indexelhetők; egy szelet maszkja
+    hozzáféréskor csomagolódik ki.
+    """
+
+    def __init__(self, packed, width):
+        self.packed = packed
+        self.width = int(width)
+
+    @classmethod
+    def from_masks(cls, masks):
+        """(N, H, W) bool maszkokból."""
+        return cls(np.packbits(masks, axis=-1), masks.shape[-1])
+
+    def __len__(self):
+        return len(self.packed)
+
+    def __getitem__(self, i):
+        return np.unpackbits(self.packed[i], axis=-1, count=self.width).astype(bool)
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes
 
 
 class LSMC:
@@ -11,6 +46,23 @@ class LSMC:
     Felelős a CT szeletek betöltéséért, HU konverzióért és a tüdőmaszk generálásáért.
     """
 
+    def __init__(self, mask_cache_size=4, mask_cache_dir=None, load_workers=None, volume_cache=None):
+        """
+        Args:
+            mask_cache_size (int): Ennyi sorozat maszkjai maradnak a memóriában (LRU).
+            mask_cache_dir (str/Path): Opcionális lemezes cache a sorozatmaszkokhoz; ha meg
+                van adva, a maszkok futások között is megmaradnak.
+            load_workers (int): Párhuzamos szeletolvasók száma a load_series-ben
+                (alapértelmezés: min(8, CPU szám)).
+            volume_cache (VolumeCache): Opcionális memóriatérképezett HU térfogat-cache; ha meg
+                van adva, a betöltők ezen keresztül olvasnak, és a DICOM dekódolás csak egyszer fut.
+        """
+        self.load_workers = load_workers or min(8, os.cpu_count() or 1)
+        self.volume_cache = volume_cache
+        self.mask_cache_size = mask_cache_size
+        self.mask_cache_dir = mask_cache_dir
+        self._mask_cache = OrderedDict()
+
     def load_scans(self, paths):
         """
         Beolvassa a szeleteket a megadott útvonalakról és listába rendezi őket.
@@ -55,32 +107,92 @@ class LSMC:
 
         A számítás az alábbi lineáris transzformációval történik: $HU = m cdot P + b$,
         ahol 'm' a Rescale Slope, 'b' a Rescale Intercept, 'P' pedig a nyers pixelérték.
+        Minden szelet a saját Rescale értékeit kapja (vegyes rescale-ű sorozatoknál is helyes).
 
         Args:
             scans (list): Betöltött pydicom szeletek listája.
         Returns:
             numpy.ndarray: Az átalakított, HU értékeket tartalmazó 16 bites egész számú tömb.
         """
-        image = np.stack([s.pixel_array for s in scans])
-        image = image.astype(np.int16)
+        image = np.empty((len(scans),) + scans[0].pixel_array.shape, dtype=np.int16)
+        for i, s in enumerate(scans):
+            image[i] = s.pixel_array
 
-        # Since the scanning equipment is cylindrical in nature and image output is square,
-        # we set the out-of-scan pixels to 0
-        image[image == -2000] = 0
+        # HU = m*P + b, szeletenként a saját Rescale Slope/Intercept értékkel
+        return rescale_to_hu(image, *rescale_params(scans))
 
-        # HU = m*P + b
-        intercept = scans[0].RescaleIntercept
-        slope = scans[0].RescaleSlope
-
-        if slope != 1:
-            image = slope * image.astype(np.float64)
-            image = image.astype(np.int16)
-
-        image += np.int16(intercept)
+    def load_series(self, paths, workers=None, sort=True, series_uid=None):
+        """
+        Egy teljes sorozat párhuzamos betöltése egyetlen, előre lefoglalt int16 HU térfogatba.
 
-        return np.array(image, dtype=np.int16)
+        A fájlokat szálkészlettel olvassa és dekódolja, a szeleteket közvetlenül a térfogat
+        helyére írja (nincs np.stack másolat), majd a szeletenkénti RescaleSlope/Intercept
+        értékekkel egyetlen vektorizált lépésben HU-ra alakít. A dekódolt szeletek nyers
+        pixeladatát a betöltés után eldobja, így a csúcsmemória kb. a térfogat mérete.
 
-    def generate_markers(self, image, hu):
+        Args:
+            paths (list): A sorozat DICOM fájljai.
+            workers (int): Párhuzamos olvasók száma (alapértelmezés: self.load_workers).
+            sort (bool): Rendezés fizikai pozíció (ImagePositionPatient a képsík normálisa mentén),
+                majd InstanceNumber szerint. False esetén a paths sorrendje marad.
+            series_uid (str): A sorozat azonosítója a hibaüzenethez (ha ismert).
+        Returns:
+            tuple: ((N, H, W) int16 HU térfogat, a sorozat leírója: series_uid, uids, paths,
+                positions a térfogat sorrendjében, spacing, origin). Térfogat-cache esetén a
+                térfogat csak olvasható memmap.
+        Raises:
+            ValueError: Ha a sorozatnak nincs egyetlen fájlja sem.
+        """
+        paths = [str(p) for p in paths]
+        if not paths:
+            raise ValueError(f"Üres sorozat, nincs betölthető DICOM fájl: {series_uid or 'ismeretlen sorozat'}")
+        if self.volume_cache is not None:
+            cached = self.volume_cache.get(paths, sort)
+            if cached is not None:
+                return cached
+        with ThreadPoolExecutor(max_workers=workers or self.load_workers) as pool:
+            # force=True szükséges lehet, ha a fájl nem teljesen szabványos
+            scans = list(pool.map(lambda p: pydicom.dcmread(p, force=True), paths))
+            if sort:
+                keys = [(slice_position(s), int(getattr(s, 'InstanceNumber', 0) or 0)) for s in scans]
+                scans = [scans[i] for i in sorted(range(len(scans)), key=lambda i: (
+                    np.isnan(keys[i][0]), 0.0 if np.isnan(keys[i][0]) else keys[i][0], keys[i][1]))]
+
+            volume = np.empty((len(scans), int(scans[0].Rows), int(scans[0].Columns)), dtype=np.int16)
+
+            def decode(i):
+                volume[i] = scans[i].pixel_array
+                # A dekódolt kép már a térfogatban van, a nyers pixeladat eldobható
+                del scans[i].PixelData
+
+            list(pool.map(decode, range(len(scans))))
+
+        volume = rescale_to_hu(volume, *rescale_params(scans))
+        info = self._series_info(scans)
+        if self.volume_cache is not None:
+            return self.volume_cache.put(paths, volume, info, sort)
+        return volume, info
+
+    @staticmethod
+    def _series_info(scans):
+        """A sorozat leírója a fejlécekből (JSON-szerializálható szótár)."""
+        positions = [slice_position(s) for s in scans]
+        finite = np.array([p for p in positions if np.isfinite(p)])
+        steps = np.abs(np.diff(finite))
+        steps = steps[steps > 0]
+        first = scans[0]
+        spacing = [float(v) for v in getattr(first, 'PixelSpacing', [1.0, 1.0])]
+        spacing.append(float(np.median(steps)) if len(steps) else float(getattr(first, 'SliceThickness', 1.0) or 1.0))
+        return {
+            "series_uid": str(getattr(first, 'SeriesInstanceUID', "")),
+            "uids": [str(s.SOPInstanceUID) for s in scans],
+            "paths": [str(s.filename) for s in scans],
+            "positions": [None if np.isnan(p) else p for p in positions],
+            "spacing": spacing,
+            "origin": [float(v) for v in getattr(first, 'ImagePositionPatient', [0.0, 0.0, 0.0])],
+        }
+
+    def generate_markers(self, image, hu, scale=1):
         """
         Jelölőket (markers) generál a Watershed szegmentáló algoritmus számára.
 
@@ -90,39 +202,193 @@ class LSMC:
         Args:
             image (numpy.ndarray): HU egységekre konvertált képtömb.
             hu (int): Küszöbérték a tüdő elkülönítéséhez.
+            scale (int): Többfelbontású mód: > 1 esetén a belső jelölő ennyiszer kisebb
+                felbontáson készül, és csak a határsávban finomodik (lásd internal_markers).
         Returns:
             tuple: (Belső jelölő, Külső jelölő, Kombinált Watershed jelölő).
         """
         # Creation of the internal Marker
-        marker_internal = image < hu
-        marker_internal = segmentation.clear_border(marker_internal)
-        marker_internal_labels = measure.label(marker_internal)
-
-        areas = [r.area for r in measure.regionprops(marker_internal_labels)]
-        areas.sort()
-
-        # Csak a legnagyobb területeket hagyjuk meg (tüdőlebenyek)
-        if len(areas) > 2:
-            for region in measure.regionprops(marker_internal_labels):
-                if region.area < areas[-2]:
-                    for coordinates in region.coords:
-                        marker_internal_labels[coordinates[0], coordinates[1]] = 0
-
-        marker_internal = marker_internal_labels > 0
+        if scale > 1:
+            marker_internal = self.internal_markers(image[None], hu, scale=scale)[0]
+        else:
+            marker_internal = self._internal_marker(image, hu)
 
         # Creation of the External Marker
-        external_a = ndimage.binary_dilation(marker_internal, iterations=10)
-        external_b = ndimage.binary_dilation(marker_internal, iterations=55)
-        marker_external = external_b ^ external_a
+        # A kereszt alakú elemmel végzett n-szeres dilatáció = taxicab távolság <= n a jelölőtől,
+        # így a 10 és 55 iterációs dilatáció helyett egyetlen távolságtranszformáció elég
+        if marker_internal.any():
+            distance = ndimage.distance_transform_cdt(~marker_internal, metric='taxicab')
+            marker_external = (distance > 10) & (distance <= 55)
+        else:
+            marker_external = np.zeros_like(marker_internal)
 
         # Creation of the Watershed Marker
-        marker_watershed = np.zeros((512, 512), dtype=np.int32)
+        marker_watershed = np.zeros(image.shape, dtype=np.int32)
         marker_watershed += marker_internal * 255
         marker_watershed += marker_external * 128
 
         return marker_internal, marker_external, marker_watershed
 
-    def make_lungmask(self, slice_dcm_path_list, hu=-400):
+    @staticmethod
+    def _internal_marker(image, hu):
+        """Egy szelet belső jelölője teljes felbontáson (a generate_markers első lépése)."""
+        marker_internal = image < hu
+        marker_internal = segmentation.clear_border(marker_internal)
+        # 8-szomszédság, mint a measure.label alapértelmezése
+        marker_internal_labels, num_regions = ndimage.label(marker_internal, structure=np.ones((3, 3)))
+
+        # Csak a legnagyobb területeket hagyjuk meg (tüdőlebenyek): a második legnagyobbnál
+        # kisebb régiók törlése egyetlen keresőtáblás indexeléssel
+        if num_regions > 2:
+            areas = np.bincount(marker_internal_labels.ravel())
+            keep = areas >= np.sort(areas[1:])[-2]
+            keep[0] = False
+            return keep[marker_internal_labels]
+        return marker_internal_labels > 0
+
+    def internal_markers(self, volume, hu, connect_3d=False, scale=1):
+        """
+        A generate_markers belső jelölője egy teljes térfogatra, egyetlen kötegelt menetben.
+
+        connect_3d=False esetén szeletenként pontosan a generate_markers belső jelölőjét adja:
+        a címkézés a síkon belül 8-szomszédságú (szeletek között nincs kapcsolat), a képszélt
+        érintő régiók törlődnek, és szeletenként a második legnagyobbnál kisebb régiók esnek ki.
+        connect_3d=True esetén a szélektől megtisztított régiókat térben (26-szomszédság)
+        összefüggőnek tekinti, és a térfogat két legnagyobb komponensét tartja meg.
+
+        scale > 1 esetén (többfelbontású mód) a jelölők és az összefüggő komponensek a
+        szeletenként scale x scale blokkátlagolt képen készülnek, a nagyított maszk pedig
+        csak a határa körüli, scale pixel széles sávban finomodik teljes felbontású
+        küszöböléssel. A pontosságvesztés a resolution_report-tal mérhető.
+
+        Args:
+            volume (numpy.ndarray): (N, H, W) HU térfogat.
+            hu (int): Küszöbérték a tüdő elkülönítéséhez.
+            connect_3d (bool): Térben összefüggő komponensek használata.
+            scale (int): Lekicsinyítési faktor (1: teljes felbontás).
+        Returns:
+            numpy.ndarray: (N, H, W) bool belső jelölők.
+        """
+        if scale > 1:
+            coarse = self.internal_markers(multires.downsample(volume, scale), hu, connect_3d)
+            return multires.refine(coarse, volume < hu, scale)
+
+        plane = np.zeros((3, 3, 3), dtype=bool)
+        plane[1] = True
+        labels, num_regions = ndimage.label(volume < hu, structure=plane)
+
+        # clear_border: a síkbeli képszélt érintő régiók törlése
+        border = np.unique(np.concatenate([labels[:, 0, :].ravel(), labels[:, -1, :].ravel(),
+                                           labels[:, :, 0].ravel(), labels[:, :, -1].ravel()]))
+        keep = np.ones(num_regions + 1, dtype=bool)
+        keep[border] = False
+        keep[0] = False
+
+        if connect_3d:
+            labels, num_regions = ndimage.label(keep[labels], structure=np.ones((3, 3, 3)))
+            if num_regions <= 2:
+                return labels > 0
+            areas = np.bincount(labels.ravel())
+            keep = areas >= np.sort(areas[1:])[-2]
+            keep[0] = False
+            return keep[labels]
+
+        # Szeletenként a második legnagyobb terület a küszöb (ha legalább 3 régió van)
+        ids = np.flatnonzero(keep)
+        areas = np.bincount(labels.ravel(), minlength=num_regions + 1)[ids]
+        objects = ndimage.find_objects(labels)
+        z = np.array([objects[i - 1][0].start for i in ids], dtype=np.int64)
+        order = np.lexsort((areas, z))
+        counts = np.bincount(z, minlength=len(volume))
+        ends = np.cumsum(counts)
+        threshold = np.zeros(len(volume), dtype=np.int64)
+        multi = counts > 2
+        threshold[multi] = areas[order][ends[multi] - 2]
+        keep[ids] = areas >= threshold[z]
+        return keep[labels]
+
+    def make_lungmask_series(self, paths, hu=-400, connect_3d=False, scale=1):
+        """
+        Egy teljes sorozat tüdőmaszkjai egyetlen betöltéssel, sorozatonként cache-elve.
+
+        A sorozat minden szeletét egyszer olvassa be, a belső jelölőket kötegelten számolja
+        (internal_markers), és az eredményt a memóriában (LRU, az útvonalak és a paraméterek
+        szerint), illetve opcionálisan lemezen (a fájlok ujjlenyomatával: útvonal, méret, mtime)
+        tárolja. Így a sorozat minden
+        annotált szelete ugyanabból a számításból kapja a maszkját.
+
+        Args:
+            paths (list): A sorozat DICOM fájljai térbeli sorrendben (pl. SeriesIndex.paths).
+            hu (int): Hounsfield küszöbérték (alapértelmezett: -400).
+            connect_3d (bool): Térben összefüggő tüdőkomponensek (lásd internal_markers).
+            scale (int): Többfelbontású mód lekicsinyítési faktora (1: teljes felbontás).
+        Returns:
+            SeriesMasks: A maszkok a paths sorrendjében indexelve.
+        """
+        params = f"{hu}|{int(connect_3d)}" + (f"|{scale}" if scale > 1 else "")
+        return self.series_masks(paths, lambda volume: self.internal_markers(volume, hu, connect_3d, scale), params)
+
+    def series_masks(self, paths, segment, params):
+        """
+        Tetszőleges szegmentáló függvény sorozatmaszkjai a make_lungmask_series cache-én keresztül.
+
+        Args:
+            paths (list): A sorozat DICOM fájljai térbeli sorrendben.
+            segment (callable): (N, H, W) HU térfogat -> (N, H, W) bool maszk.
+            params (str): A szegmentálót és paramétereit azonosító szöveg (a cache kulcs része).
+        Returns:
+            SeriesMasks: A maszkok a paths sorrendjében indexelve.
+        """
+        # A memóriabeli találathoz nem kell a fájlokat stat-olni (szeletenként hívódik)
+        key = (tuple(str(path) for path in paths), params)
+        masks = self._mask_cache.get(key)
+        if masks is not None:
+            self._mask_cache.move_to_end(key)
+            return masks
+
+        cache_file = None
+        if self.mask_cache_dir:
+            cache_file = os.path.join(self.mask_cache_dir, f"{self._series_key(paths, params)}.npz")
+        if cache_file and os.path.exists(cache_file):
+            with np.load(cache_file) as data:
+                masks = SeriesMasks(data["packed"], int(data["width"]))
+        else:
+            # A paths sorrendje (térbeli sorrend) marad, erre hivatkoznak a maszkindexek
+            volume, _ = self.load_series(paths, sort=False)
+            masks = SeriesMasks.from_masks(np.asarray(segment(volume), dtype=bool))
+            del volume
+            if cache_file:
+                os.makedirs(self.mask_cache_dir, exist_ok=True)
+                tmp_file = f"{cache_file}.tmp"
+                with open(tmp_file, "wb") as f:
+                    np.savez(f, packed=masks.packed, width=masks.width)
+                os.replace(tmp_file, cache_file)
+
+        self._mask_cache[key] = masks
+        while len(self._mask_cache) > self.mask_cache_size:
+            self._mask_cache.popitem(last=False)
+        return masks
+
+    @staticmethod
+    def _series_key(paths, params):
+        """Lemezes sorozatmaszk cache kulcs: a fájlok útvonala, mérete és mtime-ja, valamint a paraméterek."""
+        digest = hashlib.sha1(params.encode("utf-8"))
+        for path in paths:
+            st = os.stat(path)
+            digest.update(f"|{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def resolution_report(self, volume, hu=-400, scales=(2, 4), connect_3d=False):
+        """
+        A többfelbontású módok ideje és Dice eltérése a teljes felbontású belső jelölőhöz képest.
+
+        Returns:
+            list: Faktoronként egy szótár (scale, seconds, speedup, dice, dice_loss).
+        """
+        return multires.resolution_report(
+            lambda v, scale: self.internal_markers(v, hu, connect_3d, scale), volume, scales)
+
+    def make_lungmask(self, slice_dcm_path_list, hu=-400, scale=1):
         """
         A tüdőszegmentálás fő belépési pontja.
 
@@ -132,18 +398,23 @@ class LSMC:
         Args:
             slice_dcm_path_list (list): DICOM fájlok elérési útvonalai.
             hu (int): Hounsfield küszöbérték (alapértelmezett: -400).
+            scale (int): Többfelbontású mód lekicsinyítési faktora (1: teljes felbontás).
         Returns:
             list: A generált belső maszkok listája.
         """
-        train_patient_scans = self.load_scans(slice_dcm_path_list)
-        train_patient_images = self.get_pixels_hu(train_patient_scans)
+        if len(slice_dcm_path_list) == 1:
+            # Egy szelet: közvetlenül a HU kép (térfogat-cache találatnál dekódolás nélkül)
+            train_patient_images = DicomSlice(slice_dcm_path_list[0], self.volume_cache).hu()[None]
+        else:
+            train_patient_scans = self.load_scans(slice_dcm_path_list)
+            train_patient_images = self.get_pixels_hu(train_patient_scans)
 
         test_patient_internal_list = []
 
         # Iterálás a képeken (jelen esetben 1 db kép van a listában a feldolgozásnál)
         for imgi in range(len(train_patient_images[:])):
             test_patient_internal, test_patient_external, test_patient_watershed = self.generate_markers(
-                train_patient_images[imgi], hu)
+                train_patient_images[imgi], hu, scale)
             test_patient_internal_list.append(test_patient_internal)
 
         return test_patient_internal_list
\ No newline at end of file
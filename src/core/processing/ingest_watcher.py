@@ -0,0 +1,128 @@
+import os
+import threading
+from pathlib import Path
+
+from src.core.data_prep.annotation_store import AnnotationStore
+from src.core.processing.tumor_processor import TumorProcessor
+from src.utils.logger import setup_logger
+
+log = setup_logger("IngestWatcher")
+
+
+class IngestWatcher:
+    """
+    Figyelő mód a folyamatos adatbetöltéshez (continuous ingest).
+
+    Időközönként (polling) végignézi a DICOM és XML mappákat, és a méret/mtime alapján
+    felismeri az új vagy megváltozott .dcm/.xml fájlokat. Csak ezeket indexeli
+    (DataManager.update_files), párosítja, és csak az új daganatos szeleteket adja át a
+    TumorProcessor-nak, így a feldolgozott adathalmaz a változással arányos munkával
+    marad naprakész.
+
+    A még íródó fájlok kiszűrésére egy fájlt csak akkor dolgoz fel, ha mérete és mtime-ja
+    két egymást követő vizsgálat között nem változott. A törölt fájlok kimenetei megmaradnak.
+    """
+
+    def __init__(self, data_manager, output_dir="processed_data", interval=10.0, log_callback=None):
+        """
+        Args:
+            data_manager (DataManager): Egy már lefuttatott index_files()-ú DataManager.
+            output_dir (str): A TumorProcessor kimeneti mappája (nem kerül kiürítésre).
+            interval (float): Két vizsgálat közötti idő másodpercben.
+            log_callback (callable): Naplóüzenetek fogadója (pl. a GUI log ablaka).
+        """
+        self.mgr = data_manager
+        self.output_dir = output_dir
+        self.interval = interval
+        self.log_callback = log_callback or log.info
+        self._stop_event = threading.Event()
+
+        # Az utolsó vizsgálat állapota: {útvonal: (méret, mtime)}; a kiindulás az index_files()
+        # által látott állapot, így az indexelés óta érkezett fájlok is feldolgozásra kerülnek
+        self._snapshot = data_manager.file_states()
+        # A két vizsgálat óta változó (még nem stabil) fájlok
+        self._unstable = {}
+
+    def _scan(self):
+        """A két forrásmappa aktuális állapota ({útvonal: (méret, mtime_ns)})."""
+        state = {}
+        for root, suffix in ((self.mgr.dicom_dir, ".dcm"), (self.mgr.annotation_dir, ".xml")):
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    if name.endswith(suffix):
+                        # Path-normalizált kulcs, hogy egyezzen a DataManager indexének útvonalaival
+                        path = str(Path(dirpath, name))
+                        try:
+                            st = os.stat(path)
+                        except OSError:
+                            continue
+                        state[path] = (st.st_size, st.st_mtime_ns)
+        return state
+
+    def poll_once(self):
+        """
+        Egy vizsgálati kör: változások felismerése, indexelése és feldolgozása.
+
+        Returns:
+            int: Az átadott (új) daganatos szeletek száma.
+        """
+        current = self._scan()
+        changed = [p for p, stat in current.items() if self._snapshot.get(p) != stat]
+
+        # Csak a két kör óta változatlan fájlok mennek tovább
+        ready = []
+        for path in changed:
+            if self._unstable.get(path) == current[path]:
+                ready.append(path)
+                del self._unstable[path]
+            else:
+                self._unstable[path] = current[path]
+        for path in ready:
+            self._snapshot[path] = current[path]
+
+        if not ready:
+            return 0
+
+        dicom_files = [Path(p) for p in ready if p.endswith(".dcm")]
+        xml_files = [Path(p) for p in ready if p.endswith(".xml")]
+        self.log_callback(f"🔔 Változás: {len(dicom_files)} DICOM, {len(xml_files)} XML fájl.")
+
+        pairs = self.mgr.update_files(dicom_files, xml_files)
+        if not pairs:
+            return 0
+        return self._process(pairs)
+
+    def _process(self, pairs):
+        """Az érintett párok feldolgozása a meglévő kimenetek megtartásával."""
+        items = [(Path(xml_path).stem, xml_path) for _, xml_path in pairs]
+        annotations = AnnotationStore.build(items, workers=self.mgr.workers or 1, executor=self.mgr.executor)
+        # A teljes tár ujjlenyomata már nem érvényes, a következő betöltés újraépíti
+        self.mgr.annotation_store = None
+
+        store = self.mgr.build_patient_store(pairs, annotations)
+        tumors = sum(1 for _, slices in store.items() for s in slices if s['has_tumor'])
+        self.log_callback(f"➕ {len(pairs)} új/változott pár, ebből {tumors} daganatos szelet.")
+        if tumors == 0:
+            return 0
+
+        processor = TumorProcessor(store, output_dir=self.output_dir, clean_output=False,
+                                   series_index=self.mgr.series_index, mask_cache_dir=self.mgr.lung_mask_path,
+                                   volume_cache_dir=self.mgr.volume_cache_path)
+        processor.log_signal.connect(self.log_callback)
+        # A figyelő saját szálán, szinkron futtatjuk
+        processor.run()
+        return tumors
+
+    def run(self):
+        """Folyamatos figyelés a stop() hívásáig."""
+        self.log_callback(f"👀 Figyelő mód indítva ({self.interval:.0f} s időköz).")
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.log_callback(f"❌ Hiba a figyelő körben: {e}")
+            self._stop_event.wait(self.interval)
+        self.log_callback("⏹️ Figyelő mód leállítva.")
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+class OutputManifest:
+    """
+    A feldolgozott kimenetek jegyzéke az inkrementális (folytatható) feldolgozáshoz.
+
+    Kimenetenként (a .npz fájlnév a kulcs) a bemenetek ujjlenyomatát tárolja: a DICOM fájl
+    útvonala, mérete és mtime-ja, az XML tartalmának SHA-1 hash-e, a feldolgozás paraméterei,
+    sorozatmaszkok esetén pedig a teljes sorozat fájljainak ujjlenyomata (a szelet maszkja a
+    sorozat minden szeletétől függ).
+    Egy szelet csak akkor számolódik újra, ha nincs bejegyzése, vagy az ujjlenyomata eltér.
+    A jegyzék a kimeneti mappában, atomikus cserével íródik (a feldolgozás közben is
+    rendszeresen), így egy megszakadt futás a legutóbbi mentéstől folytatható.
+    """
+
+    FILE_NAME = ".lungdx_manifest.json"
+    VERSION = 1
+
+    def __init__(self, output_dir):
+        """
+        Args:
+            output_dir (str/Path): A TumorProcessor kimeneti mappája.
+        """
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / self.FILE_NAME
+        # {kimenet neve: {"inputs": ujjlenyomat, "saved": bool}}
+        self.entries = {}
+        self._dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def fingerprint(slice_data, params, series=None):
+        """
+        Egy szelet bemeneteinek ujjlenyomata.
+
+        Args:
+            slice_data (dict): A PatientStore egy szelete (path, xml_path).
+            params (str): A feldolgozás paramétereit azonosító szöveg.
+            series (str): A szelet sorozatának ujjlenyomata (series_digest), ha a tüdőmaszk a
+                teljes sorozatból készül; különben None.
+        Returns:
+            dict: {"dicom": [útvonal, méret, mtime_ns], "xml": sha1, "params": params, "series": series}.
+        """
+        st = os.stat(slice_data['path'])
+        xml_hash = None
+        if slice_data.get('xml_path'):
+            with open(slice_data['xml_path'], "rb") as f:
+                xml_hash = hashlib.sha1(f.read()).hexdigest()
+        return {"dicom": [str(slice_data['path']), st.st_size, st.st_mtime_ns], "xml": xml_hash, "params": params,
+                "series": series}
+
+    @staticmethod
+    def series_digest(paths):
+        """
+        Egy sorozat fájljainak ujjlenyomata (útvonal, méret, mtime, a térbeli sorrendben).
+
+        Szelet hozzáadása, cseréje vagy átrendeződése a sorozatban új értéket ad.
+        """
+        digest = hashlib.sha1()
+        for path in paths:
+            st = os.stat(path)
+            digest.update(f"|{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_current(self, name, inputs):
+        """
+        Naprakész-e a kimenet: egyező ujjlenyomat, és a fájl pontosan akkor létezik, ha mentett
+        kimenet (egy kihagyott szelet mellett megmaradt régi .npz elavult).
+        """
+        entry = self.entries.get(name)
+        if entry is None or entry["inputs"] != inputs:
+            return False
+        return entry["saved"] == (self.output_dir / name).exists()
+
+    def record(self, name, inputs, saved):
+        """
+        Egy elkészült (saved=True) vagy ROI hiányában kihagyott (saved=False) szelet rögzítése.
+
+        Kihagyott szeletnél egy korábbi futás megmaradt kimenete törlődik.
+        """
+        if not saved:
+            self._unlink(name)
+        self.entries[name] = {"inputs": inputs, "saved": saved}
+        self._dirty = True
+
+    def discard(self, name):
+        """
+        Egy elavult (megváltozott bemenetű) vagy hibás szelet bejegyzésének és kimenetének törlése,
+        hogy a FeatureExtractor ne olvassa tovább a régi .npz-t.
+        """
+        self._unlink(name)
+        if self.entries.pop(name, None) is not None:
+            self._dirty = True
+
+    def _unlink(self, name):
+        try:
+            (self.output_dir / name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def remove_orphans(self, names):
+        """
+        A jelenlegi feladatlistában már nem szereplő kimenetek törlése (a mappa .npz fájljai és a
+        jegyzék bejegyzései).
+
+        Args:
+            names (set): A jelenlegi szeletek kimeneti fájlnevei.
+        Returns:
+            int: A törölt .npz fájlok száma.
+        """
+        removed = 0
+        for path in self.output_dir.glob("*.npz"):
+            if path.name not in names:
+                path.unlink()
+                removed += 1
+        for name in [n for n in self.entries if n not in names]:
+            del self.entries[name]
+            self._dirty = True
+        return removed
+
+    def save(self):
+        """A jegyzék kiírása (csak változás esetén), atomikus cserével."""
+        if not self._dirty:
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
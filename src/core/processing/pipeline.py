@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SlicePipeline:
+    """
+    Háromszakaszos szeletfeldolgozás: olvasó (DICOM előtöltés), számítás és tömörítő író.
+
+    Az olvasó szál előre dekódolja a következő szeleteket, a számítás a hívó szálon fut
+    (SliceProcessor.compute), a np.savez_compressed pedig egy íróköteg szálain, a háttérben.
+    A szakaszokat korlátos sorok kötik össze: legfeljebb `prefetch` dekódolt szelet várakozik,
+    és legfeljebb `writers + 1` szelet pufferei lehetnek egyszerre használatban (számítás vagy
+    írás alatt), így a memóriahasználat nem nőhet korlátlanul. A zlib tömörítés és a fájlírás
+    elengedi a GIL-t, így szálakkal is párhuzamosan fut a következő szelet számításával.
+
+    Az eredmények (callback) a hívó szálon, a feladatok sorrendjében érkeznek.
+    """
+
+    STAGES = ("reader", "compute", "writer")
+
+    def __init__(self, slice_processor, prefetch=4, writers=2):
+        """
+        Args:
+            slice_processor (SliceProcessor): A load/compute/save lépéseket adó feldolgozó.
+            prefetch (int): Az előre dekódolt szeletek sorának mérete.
+            writers (int): Az író szálak száma.
+        """
+        self.slices = slice_processor
+        self.prefetch = max(1, prefetch)
+        self.writers = max(1, writers)
+        self._lock = threading.Lock()
+        self._busy = dict.fromkeys(self.STAGES, 0.0)
+
+    def _add_busy(self, stage, seconds):
+        with self._lock:
+            self._busy[stage] += seconds
+
+    def _read(self, tasks, loaded, stop):
+        """Olvasó szakasz: a szeletek dekódolása a korlátos sorba (None jelzi a végét)."""
+        for i, slice_data in tasks:
+            if stop.is_set():
+                return
+            start = time.perf_counter()
+            try:
+                item = (i, slice_data, self.slices.load(slice_data), None)
+            except Exception as e:
+                item = (i, slice_data, None, e)
+            self._add_busy("reader", time.perf_counter() - start)
+            if not self._put(loaded, item, stop):
+                return
+        self._put(loaded, None, stop)
+
+    @staticmethod
+    def _put(target, item, stop):
+        """Blokkoló put, amely a leállításkor feladja (így a szál nem ragad be egy tele sorba)."""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _write(self, i, slice_data, arrays, buffers, free):
+        """Író szakasz: tömörítés és mentés, majd a pufferek visszaadása."""
+        start = time.perf_counter()
+        try:
+            self.slices.save(i, slice_data, arrays)
+        finally:
+            self._add_busy("writer", time.perf_counter() - start)
+            free.put(buffers)
+
+    def _drain(self, pending, callback, block):
+        """A kész eredmények továbbadása a feladatok sorrendjében."""
+        while pending:
+            future, i, slice_data, status, message = pending[0]
+            if future is not None:
+                if not block and not future.done():
+                    return
+                try:
+                    future.result()
+                except Exception as e:
+                    status, message = "error", self.slices.error_message(i, slice_data, e)
+            pending.popleft()
+            callback(i, slice_data, status, message)
+
+    def run(self, tasks, callback):
+        """
+        A feladatok feldolgozása.
+
+        Args:
+            tasks (list): [(sorszám, szelet), ...]
+            callback (callable): callback(sorszám, szelet, állapot, naplóüzenet) – a hívó szálon.
+        Returns:
+            dict: Szakaszonként {"threads", "busy" (s), "utilization" (0-1)}, valamint "wall" (s).
+        """
+        self._busy = dict.fromkeys(self.STAGES, 0.0)
+        wall_start = time.perf_counter()
+        loaded = queue.Queue(maxsize=self.prefetch)
+        # Szabad pufferkészletek (None: az első használatkor foglalódik)
+        free = queue.Queue()
+        for _ in range(self.writers + 1):
+            free.put(None)
+        stop = threading.Event()
+        pending = deque()
+
+        reader = threading.Thread(target=self._read, args=(tasks, loaded, stop), daemon=True)
+        reader.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.writers) as pool:
+                while True:
+                    item = loaded.get()
+                    if item is None:
+                        break
+                    i, slice_data, context, error = item
+                    self._drain(pending, callback, block=False)
+                    if error is not None:
+                        pending.append((None, i, slice_data, "error", self.slices.error_message(i, slice_data, error)))
+                        continue
+
+                    context.buffers = free.get()
+                    start = time.perf_counter()
+                    try:
+                        status, message, arrays = self.slices.compute(i, slice_data, context)
+                    except Exception as e:
+                        status, message, arrays = "error", self.slices.error_message(i, slice_data, e), None
+                    self._add_busy("compute", time.perf_counter() - start)
+
+                    if arrays is None:
+                        free.put(context.buffers)
+                        pending.append((None, i, slice_data, status, message))
+                    else:
+                        future = pool.submit(self._write, i, slice_data, arrays, context.buffers, free)
+                        pending.append((future, i, slice_data, status, message))
+                self._drain(pending, callback, block=True)
+        finally:
+            stop.set()
+            reader.join()
+
+        wall = time.perf_counter() - wall_start
+        threads = {"reader": 1, "compute": 1, "writer": self.writers}
+        stats = {"wall": wall}
+        for stage in self.STAGES:
+            busy = self._busy[stage]
+            stats[stage] = {"threads": threads[stage], "busy": busy,
+                            "utilization": busy / (wall * threads[stage]) if wall > 0 else 0.0}
+        return stats
+
+    @staticmethod
+    def format_stats(stats):
+        """Egysoros összefoglaló a szakaszok kihasználtságáról (a legterheltebb a szűk keresztmetszet)."""
+        parts = [f"{name} {stats[name]['utilization'] * 100:.0f}%"
+                 + (f" ({stats[name]['threads']} szál)" if stats[name]['threads'] > 1 else "")
+                 for name in SlicePipeline.STAGES]
+        bottleneck = max(SlicePipeline.STAGES, key=lambda name: stats[name]['utilization'])
+        return f"{', '.join(parts)} | {stats['wall']:.1f} s, szűk keresztmetszet: {bottleneck}"
@@ -0,0 +1,75 @@
+import numpy as np
+import cv2
+
+from src.core.data_prep.dicom_slice import DicomSlice
+
+
+class SliceBuffers:
+    """
+    Előre lefoglalt, szeletről szeletre újrahasznosított maszkok egy adott képmérethez.
+
+    A TumorProcessor (illetve workerenként a SliceProcessor) egy példányt tart, és csak
+    eltérő képméret esetén foglal újat, így a feldolgozó ciklusban nem keletkeznek új
+    512x512-es ideiglenes tömbök.
+    """
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        # uint8 poligon maszkok (a float32 síkokat a ProcessedSlice állítja elő olvasáskor)
+        self.tumor_mask = np.empty(self.shape, dtype=np.uint8)
+        self.roi_mask = np.empty(self.shape, dtype=np.uint8)
+        self.inverse_mask = np.empty(self.shape, dtype=np.uint8)
+
+    @classmethod
+    def reuse(cls, buffers, shape):
+        """A meglévő pufferek, ha a méret egyezik, különben egy új készlet."""
+        if buffers is not None and buffers.shape == tuple(shape):
+            return buffers
+        return cls(shape)
+
+
+class SliceContext:
+    """
+    Egy szelet feldolgozási környezete: a DICOM egyszer dekódolódik, minden lépés ugyanazt a
+    képet (illetve a belőle számolt HU képet) és a közös pufferek nézeteit kapja.
+
+    A visszaadott maszkok a pufferek nézetei; a pufferek újrahasznosítása előtt (a következő szelet
+    ugyanazon a pufferkészleten) a mentésnek meg kell történnie. A pufferek csak az első maszknál
+    foglalódnak (vagy a buffers attribútumon keresztül előre hozzárendelhetők).
+    """
+
+    def __init__(self, path, volume_cache=None, buffers=None):
+        """
+        Args:
+            path (str/Path): A DICOM fájl.
+            volume_cache (VolumeCache): A HU képhez (találat esetén nincs HU konverzió).
+            buffers (SliceBuffers): Az előző szelet pufferei (méreteltérés esetén újat foglal).
+        """
+        self.dicom = DicomSlice(path, volume_cache)
+        # Csak a float32 kép kell (SimpleITK kép és további másolatok nélkül)
+        self.image = self.dicom.pixels.astype(np.float32, copy=False)
+        self.buffers = buffers
+
+    def _planes(self):
+        """A szelet pufferei (az első használatkor a kép méretéhez igazítva)."""
+        self.buffers = SliceBuffers.reuse(self.buffers, self.image.shape)
+        return self.buffers
+
+    def hu(self):
+        """A HU kép a már dekódolt pixeltömbből (a fájl nem nyílik meg újra)."""
+        return self.dicom.hu()
+
+    def tumor_masks(self, snake_points, roi_points):
+        """
+        A daganat és a környező ROI (keret mínusz daganat) maszkja a kontúr és a keret poligonjából.
+
+        Returns:
+            tuple: (tumor_mask, inverse_mask) uint8 nézetek (255 a poligonon belül).
+        """
+        b = self._planes()
+        b.tumor_mask.fill(0)
+        cv2.fillPoly(b.tumor_mask, pts=[snake_points], color=255)
+        b.roi_mask.fill(0)
+        cv2.fillPoly(b.roi_mask, pts=[roi_points], color=255)
+        cv2.subtract(b.roi_mask, b.tumor_mask, dst=b.inverse_mask)
+        return b.tumor_mask, b.inverse_mask
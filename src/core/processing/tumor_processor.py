@@ -1,16 +1,237 @@
 # src/core/processing/tumor_processor.py
-import numpy as np
 import cv2
 import os
 import gc
 import shutil  # Új import a törléshez
 import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PyQt6.QtCore import QThread, pyqtSignal
 
 # Importok a saját moduljaidból
-from src.core.segmentation.lung_segmenter import LungSegmenter
 import src.utils.project_utils as project_utils
 from src.core.lsmc import LSMC
+from src.core.data_prep.volume_cache import VolumeCache
+from src.core.data_prep.dicom_slice import DicomSlice
+from src.core.segmentation.backends import LSMCBackend, get_backend
+from src.core.processing.slice_context import SliceContext
+from src.core.processing.output_manifest import OutputManifest
+from src.core.processing.pipeline import SlicePipeline
+from src.core.data_prep.processed_slice import save_processed
+
+
+class SliceProcessor:
+    """
+    Egy daganatos szelet feldolgozása (Qt nélkül), hogy külön folyamatban is futtatható legyen.
+
+    A TumorProcessor soros módban közvetlenül, párhuzamos módban a folyamatkészlet minden
+    workerében egy-egy példányon keresztül használja; a kimenet tömbjei mindkét esetben azonosak.
+    """
+
+    target_labels = ['A', 'B', 'G', 'D']
+    # A kimenet formátumának verziója (az inkrementális jegyzék paramétereinek része)
+    VERSION = 2
+
+    def __init__(self, output_dir="processed_data", series_index=None, mask_cache_dir=None, lung_mask_3d=False,
+                 volume_cache_dir=None, lung_mask_scale=1, segmentation_backend="lsmc", backend_options=None):
+        """A paraméterek jelentése a TumorProcessor-nál."""
+        self.output_dir = output_dir
+        self.series_index = series_index
+        self.lsmc = LSMC(mask_cache_dir=mask_cache_dir,
+                         volume_cache=VolumeCache(volume_cache_dir) if volume_cache_dir else None)
+        if segmentation_backend == "lsmc":
+            self.backend = LSMCBackend(-400, lung_mask_3d, lung_mask_scale, lsmc=self.lsmc)
+        else:
+            self.backend = get_backend(segmentation_backend, **(backend_options or {}))
+        # A szeletek közös, újrahasznosított pufferei (SliceBuffers)
+        self.buffers = None
+
+    def prepare_data_for_roi2rect(self, annotations):
+        """Átalakítja az annotációkat One-Hot kódolt listává."""
+        img_data_list = []
+        if not annotations:
+            return None
+
+        for ann in annotations:
+            xmin, ymin, xmax, ymax = ann['bbox']
+            label = ann['label']
+            one_hot = [0] * len(self.target_labels)
+            if label in self.target_labels:
+                idx = self.target_labels.index(label)
+                one_hot[idx] = 1
+
+            row = [xmin, ymin, xmax, ymax] + one_hot
+            img_data_list.append(row)
+        return img_data_list
+
+    def params(self):
+        """A kimenetet meghatározó beállítások azonosítója (az OutputManifest ujjlenyomatához)."""
+        mode = "series" if self.series_index is not None else "slice"
+        return f"v{self.VERSION}|{self.backend.name}|{self.backend.params()}|{mode}"
+
+    @staticmethod
+    def describe(i, slice_data):
+        """
+        A szelet páciens azonosítója és neve (név hiányában a fájlnévből, végső esetben a sorszámból).
+
+        Returns:
+            tuple: (patient_id, img_name)
+        """
+        img_name = slice_data.get('img_name', os.path.basename(slice_data.get('path', f'slice_{i}.dcm')))
+        return slice_data.get('patient_id', 'Unknown'), img_name
+
+    def output_name(self, i, slice_data):
+        """A szelet kimeneti .npz fájlneve."""
+        p_id, img_name = self.describe(i, slice_data)
+        return f"{p_id}_{img_name}.npz"
+
+    def series_of(self, slice_data):
+        """
+        A szelet helye a sorozat-indexben.
+
+        Returns:
+            tuple: (SeriesInstanceUID, index a sorozaton belül), vagy None.
+        """
+        if self.series_index is None:
+            return None
+        # A párosítás kulcsa az XML fájlnév (= SOPInstanceUID)
+        return self.series_index.locate(Path(slice_data['xml_path']).stem)
+
+    def lung_mask(self, slice_data, context=None):
+        """
+        A szelet belső tüdőmaszkja a beállított szegmentáló backenddel.
+
+        Sorozat-index esetén a sorozat közös (cache-elt) maszkjaiból olvassa ki
+        (LSMC.series_masks), különben szeletenként számolja (a context már dekódolt képéből).
+
+        Returns:
+            numpy.ndarray: Bool maszk, vagy None, ha nem készült.
+        """
+        location = self.series_of(slice_data)
+        if location is not None:
+            series_uid, position = location
+            masks = self.lsmc.series_masks(self.series_index.paths(series_uid),
+                                           self.backend.segment_volume, self.backend.params())
+            return masks[position]
+        if context is None:
+            return self.backend.segment_slice(DicomSlice(slice_data['path'], self.lsmc.volume_cache).hu())
+        return self.backend.segment_slice(context.hu())
+
+    def load(self, slice_data):
+        """1) Adat beolvasás: a DICOM egyszeri dekódolása (a pipeline olvasó szakasza)."""
+        return SliceContext(slice_data['path'], self.lsmc.volume_cache)
+
+    def compute(self, i, slice_data, context):
+        """
+        2-6) ROI, kontúr, maszkok és parenchima egy már dekódolt szeleten.
+
+        A maszkok a context pufferein készülnek, ezért a mentésig azok nem használhatók újra.
+
+        Returns:
+            tuple: (állapot, naplóüzenet, a save_processed paraméterei vagy None).
+        """
+        p_id, img_name = self.describe(i, slice_data)
+        origin_img = context.image
+        # 2) ROI + Maszk generálás
+        img_data_formatted = self.prepare_data_for_roi2rect(slice_data['annotations'])
+        tumor_mask_ndarray, roi_pos, tumor_label = project_utils.roi2rect(
+            img_name=img_name,
+            img_np=origin_img,
+            img_data=img_data_formatted,
+            label_list=self.target_labels,
+            image=origin_img,
+            draw=False
+        )
+
+        if roi_pos is None or tumor_mask_ndarray is None:
+            return "skipped", f"⚠️ SKIPPED ({img_name}): Nincs érvényes ROI.", None
+
+        # 3) Maszk normalizálása
+        if len(tumor_mask_ndarray.shape) == 3:
+            tumor_mask_gray = cv2.cvtColor(tumor_mask_ndarray, cv2.COLOR_BGR2GRAY)
+        else:
+            tumor_mask_gray = tumor_mask_ndarray
+
+        # 4) GVF Snake
+        _, snake_points, roi_points = project_utils.gvf_snake(tumor_mask_gray, roi_pos, draw=False)
+
+        # 5) Poligon maszkok (a context pufferein)
+        final_tumor_mask, inverse_roi_mask = context.tumor_masks(snake_points, roi_points)
+
+        # 6) Parenchyma (a tüdőmaszk; a síkot az olvasó állítja elő)
+        lung_mask_400 = self.lung_mask(slice_data, context)
+
+        arrays = dict(
+            original=origin_img,
+            label=tumor_label,
+            patient_id=p_id,
+            tumor_mask=final_tumor_mask,
+            roi_mask=inverse_roi_mask,
+            lung_mask=lung_mask_400
+        )
+        return "saved", f"✅ Mentve: {p_id} -> {img_name}", arrays
+
+    def save(self, i, slice_data, arrays):
+        """
+        7) Mentés kompakt .npz fájlba (a pipeline író szakasza).
+
+        Az eredeti kép és a maszkok kerülnek mentésre; a parenchima, a daganat és a ROI síkját
+        a data_prep.processed_slice.ProcessedSlice állítja vissza olvasáskor.
+        """
+        save_path = os.path.join(self.output_dir, self.output_name(i, slice_data))
+        save_processed(save_path, **arrays)
+
+    def error_message(self, i, slice_data, error):
+        """A kihagyott (hibás) szelet naplóüzenete."""
+        p_id, img_name = self.describe(i, slice_data)
+        return f"❌ Kihagyva {p_id} -> ({img_name}): {str(error)}"
+
+    def process(self, i, slice_data):
+        """
+        Egy szelet feldolgozása és mentése .npz fájlba (load, compute, save egymás után).
+
+        Args:
+            i (int): A szelet sorszáma a feladatlistában (a név nélküli szeletek elnevezéséhez).
+            slice_data (dict): A PatientStore egy szelete.
+        Returns:
+            tuple: (állapot, naplóüzenet); az állapot "saved", "skipped" (nincs érvényes ROI) vagy "error".
+        """
+        try:
+            # Egyszeri dekódolás, a lépések a context nézeteit kapják (a pufferek szeletről szeletre újrahasznosulnak)
+            context = self.load(slice_data)
+            context.buffers = self.buffers
+            status, message, arrays = self.compute(i, slice_data, context)
+            self.buffers = context.buffers
+            if arrays is not None:
+                self.save(i, slice_data, arrays)
+            return status, message
+        except Exception as e:
+            return "error", self.error_message(i, slice_data, e)
+
+
+# A folyamatkészlet workereinek saját SliceProcessor példánya (a _init_worker hozza létre)
+_worker = None
+
+
+def _init_worker(config):
+    """Folyamatkészlet inicializáló: workerenként egy SliceProcessor (saját LSMC cache-sel)."""
+    global _worker
+    _worker = SliceProcessor(**config)
+
+
+def _process_chunk(chunk):
+    """
+    Egy (sorozatnyi) szeletcsomag feldolgozása a workerben.
+
+    Modul szintű függvény, hogy folyamatkészletben (ProcessPoolExecutor) is futtatható legyen.
+    A csomag sima szelet-szótárakat tartalmaz (TumorProcessor.payload), nem SliceRecord-okat.
+
+    Returns:
+        list: A szeletek (állapot, naplóüzenet) párjai a csomag sorrendjében.
+    """
+    results = [_worker.process(i, slice_data) for i, slice_data in chunk]
+    gc.collect()
+    return results
 
 
 class TumorProcessor(QThread):
@@ -22,15 +243,66 @@ class TumorProcessor(QThread):
     progress_signal = pyqtSignal(int)
     finished = pyqtSignal()
 
-    def __init__(self, patient_store, output_dir="processed_data"):
+    # Inkrementális módban ennyi elkészült szeletenként íródik ki a jegyzék
+    MANIFEST_FLUSH = 20
+
+    def __init__(self, patient_store, output_dir="processed_data", clean_output=True,
+                 series_index=None, mask_cache_dir=None, lung_mask_3d=False, volume_cache_dir=None,
+                 lung_mask_scale=1, segmentation_backend="lsmc", backend_options=None, workers=1,
+                 incremental=False, pipeline=True, prefetch=4, writer_threads=2):
+        """
+        Args:
+            patient_store (PatientStore): A feldolgozandó szeletek tára.
+            output_dir (str): A .npz kimenetek mappája.
+            clean_output (bool): Ha False, a meglévő kimenetek megmaradnak (pl. figyelő módban
+                csak az új szeletek kerülnek hozzá).
+            series_index (SeriesIndex): Ha meg van adva, a tüdőmaszk sorozatonként egyszer
+                készül el (LSMC.make_lungmask_series), nem szeletenként.
+            mask_cache_dir (str/Path): A sorozatmaszkok lemezes cache-e (opcionális).
+            lung_mask_3d (bool): Térben összefüggő tüdőmaszk (csak series_index esetén).
+            volume_cache_dir (str/Path): Memóriatérképezett HU térfogat-cache (opcionális); ismételt
+                futáskor a tüdőmaszkokhoz nem kell újra dekódolni a DICOM-okat.
+            lung_mask_scale (int): Többfelbontású tüdőmaszk lekicsinyítési faktora (1: teljes
+                felbontás; a pontosságvesztés az LSMC.resolution_report-tal mérhető).
+            segmentation_backend (str/SegmentationBackend): A tüdőmaszk backendje (név vagy példány,
+                lásd segmentation.backends.available_backends). Az "lsmc" a lung_mask_3d és
+                lung_mask_scale beállításokat használja.
+            backend_options (dict): Egyéb backend esetén a konstruktor paraméterei.
+            workers (int): Párhuzamos folyamatok száma (1: soros feldolgozás ezen a szálon). A szeletek
+                sorozatonként csoportosítva kerülnek a workerekhez, így egy sorozat térfogata és
+                maszkjai csak egy folyamatban készülnek el. A kimenet tömbjei a soros móddal azonosak.
+            incremental (bool): Inkrementális, folytatható mód: a kimeneti mappa nem ürül, csak a
+                hiányzó vagy elavult szeletek (OutputManifest ujjlenyomat) számolódnak újra, és a
+                jelenlegi szeletekhez nem tartozó (árva) kimenetek törlődnek. A clean_output ilyenkor
+                hatástalan.
+            pipeline (bool): Soros módban szakaszos feldolgozás (SlicePipeline): előtöltő olvasó szál,
+                számítás ezen a szálon, háttérben tömörítő író szálak; a végén szakaszonkénti
+                kihasználtság a naplóban. False esetén szeletenként egymás után (a kimenet tömbjei azonosak).
+            prefetch (int): Az előre dekódolt szeletek sorának mérete.
+            writer_threads (int): A tömörítő író szálak száma.
+        """
         super().__init__()
         self.patient_store = patient_store
         self.output_dir = output_dir
-        self.lsmc = LSMC()
-        self.target_labels = ['A', 'B', 'G', 'D']
+        self.clean_output = clean_output
+        self.workers = workers
+        self.incremental = incremental
+        self.pipeline = pipeline
+        self.prefetch = prefetch
+        self.writer_threads = writer_threads
+        # A SliceProcessor paraméterei (párhuzamos módban ebből épül fel a workerek példánya)
+        self.config = dict(output_dir=output_dir, series_index=series_index, mask_cache_dir=mask_cache_dir,
+                           lung_mask_3d=lung_mask_3d, volume_cache_dir=volume_cache_dir,
+                           lung_mask_scale=lung_mask_scale, segmentation_backend=segmentation_backend,
+                           backend_options=backend_options)
+        self.slices = SliceProcessor(**self.config)
 
         # --- Mappa ürítése/létrehozása inicializáláskor ---
-        self._prepare_output_directory()
+        if clean_output and not incremental:
+            self._prepare_output_directory()
+        else:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self.manifest = OutputManifest(output_dir) if incremental else None
 
     def _prepare_output_directory(self):
         """
@@ -54,31 +326,98 @@ class TumorProcessor(QThread):
         except Exception as e:
             print(f"❌ Error during folder cleanup: {e}")
 
-    # ... (prepare_data_for_roi2rect változatlan) ...
-    def prepare_data_for_roi2rect(self, annotations):
-        """Átalakítja az annotációkat One-Hot kódolt listává."""
-        img_data_list = []
-        if not annotations:
-            return None
+    def chunks(self, tasks):
+        """
+        A feladatok csoportosítása sorozatonként (sorozat-index nélkül páciensenként).
 
-        for ann in annotations:
-            xmin, ymin, xmax, ymax = ann['bbox']
-            label = ann['label']
-            one_hot = [0] * len(self.target_labels)
-            if label in self.target_labels:
-                idx = self.target_labels.index(label)
-                one_hot[idx] = 1
+        Args:
+            tasks (list): [(sorszám, szelet), ...] a daganatos szeletekből.
+        Returns:
+            list: Csomagok listája, mindegyik [(sorszám, szelet), ...] az eredeti sorrendben.
+        """
+        groups = {}
+        for i, slice_data in tasks:
+            location = self.slices.series_of(slice_data)
+            key = location[0] if location is not None else slice_data.get('patient_id', 'Unknown')
+            groups.setdefault(key, []).append((i, slice_data))
+        return list(groups.values())
 
-            row = [xmin, ymin, xmax, ymax] + one_hot
-            img_data_list.append(row)
-        return img_data_list
+    @staticmethod
+    def payload(chunk):
+        """
+        Egy csomag a workernek küldhető formában: [(sorszám, szelet-szótár), ...].
+
+        A SliceRecord a teljes PatientStore-ra (és annak AnnotationStore-jára) hivatkozik, így
+        közvetlenül elküldve minden feladattal a teljes tár pickle-ölődne; a to_dict() sorok csak
+        a szelet saját mezőit viszik át.
+        """
+        return [(i, s.to_dict() if hasattr(s, 'to_dict') else s) for i, s in chunk]
+
+    def _pending(self, tasks):
+        """
+        Inkrementális mód: az árva kimenetek törlése és a naprakész szeletek kiszűrése.
+
+        Returns:
+            list: A (hiányzó vagy elavult) újraszámolandó [(sorszám, szelet), ...] feladatok.
+        """
+        params = self.slices.params()
+        names = {self.slices.output_name(i, s) for i, s in tasks}
+        removed = self.manifest.remove_orphans(names)
+
+        pending = []
+        self._inputs = {}
+        # Sorozatonként egyszer számolt ujjlenyomat (a sorozatmaszk a teljes sorozattól függ)
+        series_digests = {}
+        for i, slice_data in tasks:
+            name = self.slices.output_name(i, slice_data)
+            try:
+                location = self.slices.series_of(slice_data)
+                series = None
+                if location is not None:
+                    series = series_digests.get(location[0])
+                    if series is None:
+                        series = series_digests[location[0]] = OutputManifest.series_digest(
+                            self.slices.series_index.paths(location[0]))
+                inputs = OutputManifest.fingerprint(slice_data, params, series)
+            except OSError:
+                # Hiányzó bemenet: a régi kimenet elavult, a feldolgozás jelzi a hibát
+                self.manifest.discard(name)
+                pending.append((i, slice_data))
+                continue
+            if not self.manifest.is_current(name, inputs):
+                # A régi kimenet nem maradhat meg, ha az újraszámolás kihagyja vagy hibára fut
+                self.manifest.discard(name)
+                self._inputs[i] = inputs
+                pending.append((i, slice_data))
+        self.manifest.save()
+
+        self.log_signal.emit(f"♻️ Inkrementális mód: {len(tasks) - len(pending)} naprakész, "
+                             f"{len(pending)} feldolgozandó szelet, {removed} árva kimenet törölve.")
+        return pending
+
+    def _finish(self, i, slice_data, status, message):
+        """Egy elkészült szelet naplózása és (inkrementális módban) rögzítése a jegyzékben."""
+        self.log_signal.emit(message)
+        if self.manifest is not None and status == "error":
+            # Hibás szelet: nem marad utána (akár részleges) kimenet, és bejegyzés sem
+            self.manifest.discard(self.slices.output_name(i, slice_data))
+            return
+        inputs = self._inputs.get(i)
+        if inputs is not None:
+            self.manifest.record(self.slices.output_name(i, slice_data), inputs, status == "saved")
+            self._unsaved += 1
+            # Rendszeres mentés, hogy egy megszakadt futás innen folytatódjon
+            if self._unsaved >= self.MANIFEST_FLUSH:
+                self.manifest.save()
+                self._unsaved = 0
 
     def run(self):
         """
         Optimalizált feldolgozási folyamat.
         """
         # Jelzés a rendszer naplónak az ürítésről
-        self.log_signal.emit(f"🧹 Kimeneti könyvtár ({self.output_dir}) kiürítve.")
+        if self.clean_output and not self.incremental:
+            self.log_signal.emit(f"🧹 Kimeneti könyvtár ({self.output_dir}) kiürítve.")
 
         # Feladatok kigyűjtése
         tasks = []
@@ -86,82 +425,68 @@ class TumorProcessor(QThread):
             for s in slices:
                 if s.get('has_tumor', False):
                     tasks.append(s)
+        tasks = list(enumerate(tasks))
+
+        self._inputs, self._unsaved = {}, 0
+        if self.incremental:
+            tasks = self._pending(tasks)
 
         total = len(tasks)
         self.log_signal.emit(f"⚙️ Feldolgozás indítása: {total} daganatos szelet (Optimalizált mód)...")
 
-        for i, slice_data in enumerate(tasks):
-            # Biztonságos lekérés: ha nincs 'img_name', generálunk egyet a fájlnévből
-            img_name = slice_data.get('img_name', os.path.basename(slice_data.get('path', f'slice_{i}.dcm')))
-            p_id = slice_data.get('patient_id', 'Unknown')
+        if self.workers > 1 and total > 1:
+            self._run_parallel(tasks)
+        elif self.pipeline and total > 1:
+            self._run_pipeline(tasks)
+        else:
+            for done, (i, slice_data) in enumerate(tasks, 1):
+                self._finish(i, slice_data, *self.slices.process(i, slice_data))
+                # Memória felszabadítás
+                if done % 5 == 1: gc.collect()
+                self.progress_signal.emit(int((done / total) * 100))
 
-            try:
-                # 1) Adat beolvasás
-                _, _, origin_img, _, _, _, _ = LungSegmenter.load_file(slice_data['path'])
-                origin_img = origin_img.astype('float32')
-                # 2) ROI + Maszk generálás
-                img_data_formatted = self.prepare_data_for_roi2rect(slice_data['annotations'])
-                tumor_mask_ndarray, roi_pos, tumor_label = project_utils.roi2rect(
-                    img_name=img_name,
-                    img_np=origin_img,
-                    img_data=img_data_formatted,
-                    label_list=self.target_labels,
-                    image=origin_img
-                )
-
-                if roi_pos is None or tumor_mask_ndarray is None:
-                    self.log_signal.emit(f"⚠️ SKIPPED ({img_name}): Nincs érvényes ROI.")
-                    continue
-
-                # 3) Maszk normalizálása
-                if len(tumor_mask_ndarray.shape) == 3:
-                    tumor_mask_gray = cv2.cvtColor(tumor_mask_ndarray, cv2.COLOR_BGR2GRAY)
-                else:
-                    tumor_mask_gray = tumor_mask_ndarray
-
-                # 4) GVF Snake
-                _, snake_points, roi_points = project_utils.gvf_snake(tumor_mask_gray, roi_pos)
-
-                # 5) Poligon maszkok
-                final_tumor_mask = np.zeros(tumor_mask_gray.shape, dtype='uint8')
-                cv2.fillPoly(final_tumor_mask, pts=[snake_points], color=255)
-                masked_tumor = np.where(final_tumor_mask > 0, origin_img, 0).astype('float32')
-
-                roi_mask = np.zeros(tumor_mask_gray.shape, dtype='uint8')
-                cv2.fillPoly(roi_mask, pts=[roi_points], color=255)
-                inverse_roi_mask = cv2.subtract(roi_mask, final_tumor_mask)
-                inverted_masked_roi = np.where(inverse_roi_mask > 0, origin_img, 0).astype('float32')
-
-                # 6) Parenchyma
-                mask_list_400 = self.lsmc.make_lungmask([slice_data['path']], -400)
-                segmented_parenchyma = (mask_list_400[0] * origin_img).astype(
-                    'float32') if mask_list_400 else np.zeros_like(origin_img)
-
-                # 7) Mentés
-                save_path = os.path.join(self.output_dir, f"{p_id}_{img_name}.npz")
-                np.savez_compressed(
-                    save_path,
-                    original=origin_img,
-                    parenchyma=segmented_parenchyma,
-                    masked_tumor=masked_tumor,
-                    inverted_roi=inverted_masked_roi,
-                    label=tumor_label,
-                    patient_id=p_id
-                )
-                self.log_signal.emit(f"✅ Mentve: {p_id} -> {img_name}")
-            except Exception as e:
-                self.log_signal.emit(f"❌ Kihagyva {p_id} -> ({img_name}): {str(e)}")
-                continue
+        if self.incremental:
+            self.manifest.save()
+        self.log_signal.emit("🏁 Feldolgozás befejezve. A RAM felszabadítva.")
+        self.finished.emit()
 
-            finally:
-                # 8) Memória felszabadítás
-                vars_to_del = ['origin_img', 'tumor_mask_ndarray', 'tumor_mask_gray', 'final_tumor_mask',
-                               'masked_tumor', 'roi_mask', 'inverted_masked_roi', 'segmented_parenchyma']
-                for v in vars_to_del:
-                    if v in locals(): del locals()[v]
-                if i % 5 == 0: gc.collect()
+    def _run_pipeline(self, tasks):
+        """Soros feldolgozás szakaszokra bontva (olvasó / számítás / író), kihasználtsági jelentéssel."""
+        total, done = len(tasks), 0
 
-            self.progress_signal.emit(int(((i + 1) / total) * 100))
+        def on_result(i, slice_data, status, message):
+            nonlocal done
+            done += 1
+            self._finish(i, slice_data, status, message)
+            # Memória felszabadítás
+            if done % 5 == 1: gc.collect()
+            self.progress_signal.emit(int((done / total) * 100))
 
-        self.log_signal.emit("🏁 Feldolgozás befejezve. A RAM felszabadítva.")
-        self.finished.emit()
\ No newline at end of file
+        stats = SlicePipeline(self.slices, self.prefetch, self.writer_threads).run(tasks, on_result)
+        self.log_signal.emit(f"📊 Szakaszok kihasználtsága: {SlicePipeline.format_stats(stats)}")
+
+    def _run_parallel(self, tasks):
+        """A sorozatcsomagok szétosztása egy folyamatkészletre; a naplók és a haladás ezen a szálon."""
+        chunks = self.chunks(tasks)
+        workers = min(self.workers, len(chunks))
+        self.log_signal.emit(f"🧵 Párhuzamos mód: {len(chunks)} sorozatcsomag, {workers} folyamat.")
+        total, done = len(tasks), 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.config,)) as pool:
+                futures = {pool.submit(_process_chunk, self.payload(chunk)): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        # A worker folyamat hibája: a csomag minden szelete kimarad
+                        results = [("error", "❌ Kihagyva {} -> ({}): {}".format(*self.slices.describe(i, s), e))
+                                   for i, s in chunk]
+                    for (i, slice_data), (status, message) in zip(chunk, results):
+                        done += 1
+                        self._finish(i, slice_data, status, message)
+                        self.progress_signal.emit(int((done / total) * 100))
+        except Exception as e:
+            self.log_signal.emit(f"❌ Párhuzamos feldolgozási hiba: {e}")
+            traceback.print_exc()
@@ -0,0 +1,116 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Regisztrált backendek: {név: osztály}
+_BACKENDS = {}
+
+
+def register_backend(name):
+    """
+    Osztálydekorátor: egy SegmentationBackend alosztály regisztrálása a megadott néven.
+
+    Példa:
+        @register_backend("sajat")
+        class SajatBackend(SegmentationBackend): ...
+
+    Raises:
+        TypeError: Ha az osztály nem valósítja meg az összes absztrakt metódust.
+    """
+    def decorator(cls):
+        if cls.__abstractmethods__:
+            raise TypeError(f"A(z) {name} backend hiányos, nem implementált: "
+                            f"{', '.join(sorted(cls.__abstractmethods__))}")
+        cls.name = name
+        _BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_backend(backend="lsmc", **options):
+    """
+    Backend példány név alapján (egy már létrehozott példányt változatlanul visszaad).
+
+    Args:
+        backend (str/SegmentationBackend): A backend neve (lásd available_backends) vagy példánya.
+        **options: A backend konstruktorának paraméterei (pl. hu, scale, connect_3d).
+    Returns:
+        SegmentationBackend: A backend.
+    Raises:
+        ValueError: Ismeretlen backend név esetén.
+    """
+    if isinstance(backend, SegmentationBackend):
+        return backend
+    cls = _BACKENDS.get(backend)
+    if cls is None:
+        raise ValueError(f"Ismeretlen szegmentáló backend: {backend} ({'/'.join(available_backends())})")
+    return cls(**options)
+
+
+def available_backends():
+    """A regisztrált backendek nevei."""
+    return sorted(_BACKENDS)
+
+
+class SegmentationBackend(ABC):
+    """
+    Tüdőszegmentáló backend interfész.
+
+    Egy backend HU térfogatból (N, H, W) bool tüdőmaszkot készít. A params() szöveg
+    azonosítja a backendet és beállításait; ez kerül a sorozatmaszk cache kulcsába.
+    A segment_volume kötelező: hiányában a regisztráció (illetve a példányosítás) TypeError-ral leáll.
+    """
+
+    name = None
+
+    @abstractmethod
+    def segment_volume(self, volume):
+        """
+        Args:
+            volume (numpy.ndarray): (N, H, W) HU térfogat.
+        Returns:
+            numpy.ndarray: (N, H, W) bool maszk.
+        """
+
+    def segment_slice(self, image):
+        """Egyetlen (H, W) HU szelet maszkja."""
+        return self.segment_volume(np.asarray(image)[None])[0]
+
+    def params(self):
+        return self.name
+
+
+@register_backend("lsmc")
+class LSMCBackend(SegmentationBackend):
+    """Watershed-jelölő alapú belső tüdőmaszk (LSMC.internal_markers, alapértelmezetten -400 HU)."""
+
+    def __init__(self, hu=-400, connect_3d=False, scale=1, lsmc=None):
+        from src.core.lsmc import LSMC
+        self.hu = hu
+        self.connect_3d = connect_3d
+        self.scale = scale
+        self.lsmc = lsmc or LSMC()
+
+    def segment_volume(self, volume):
+        return self.lsmc.internal_markers(volume, self.hu, self.connect_3d, self.scale)
+
+    def params(self):
+        # Az LSMC.make_lungmask_series kulcsával egyezik, így a két út közös cache-t használ
+        return f"{self.hu}|{int(self.connect_3d)}" + (f"|{self.scale}" if self.scale > 1 else "")
+
+
+@register_backend("threshold")
+class ThresholdBackend(SegmentationBackend):
+    """Küszöbölés + zárás + lyukkitöltés (LungSegmenter.segment_masks, alapértelmezetten -320 HU)."""
+
+    def __init__(self, hu=-320, scale=1, workers=1):
+        from src.core.segmentation.lung_segmenter import LungSegmenter
+        self.segmenter = LungSegmenter(threshold_hu=hu)
+        self.scale = scale
+        self.workers = workers
+
+    def segment_volume(self, volume):
+        return self.segmenter.segment_masks(volume, workers=self.workers, scale=self.scale).astype(bool)
+
+    def params(self):
+        return f"{self.name}|{self.segmenter.threshold_hu}|{self.scale}"
@@ -1,9 +1,10 @@
 # src/core/segmentation/lung_segmenter.py
 import numpy as np
-import pydicom
-import SimpleITK as sitk
-from skimage import measure, morphology
+from concurrent.futures import ThreadPoolExecutor
+from skimage import morphology
 from scipy import ndimage
+from src.core.data_prep.dicom_slice import DicomSlice
+from src.core.segmentation import multires
 
 
 class LungSegmenter:
@@ -21,11 +22,32 @@ class LungSegmenter:
         self.threshold_hu = threshold_hu
 
     @staticmethod
-    def load_file(path):
+    def load_file(path, mode="full"):
         """
         Beolvas egy DICOM fájlt, kezeli a hiányzó metaadatokat és az RGB konverziót.
+
+        Args:
+            path (str/Path): A DICOM fájl elérési útja.
+            mode (str): A kért kimenet:
+                'full' – a teljes tuple (pydicom_ds, sitk_image, img_array, slices, width, height, channel),
+                'raw' – a tárolt pixelértékek (másolás nélküli nézet),
+                'pixels' – a float32 kép (a 'full' img_array eleme, SimpleITK kép nélkül),
+                'hu' – HU kép float32-ben,
+                'lazy' – DicomSlice, amely minden kimenetet (a SimpleITK képet is) első hozzáféréskor állít elő.
         """
-        ds = pydicom.dcmread(str(path))
+        image = DicomSlice(path)
+        if mode == "raw":
+            return image.raw
+        if mode == "pixels":
+            return image.pixels
+        if mode == "hu":
+            return image.hu(np.float32)
+        if mode == "lazy":
+            return image
+        if mode != "full":
+            raise ValueError(f"Ismeretlen betöltési mód: {mode} (full/raw/pixels/hu/lazy)")
+
+        ds = image.ds
 
         # Biztonsági mentés: Ha valahol később a SliceLocation-t keresné a kód,
         # de nincs a fájlban, adjunk neki egy alapértelmezett értéket, hogy ne szálljon el.
@@ -33,38 +55,12 @@ class LungSegmenter:
             # Megpróbáljuk az ImagePositionPatient-ből kiszedni a Z-t, ha az sincs, marad a 0.0
             ds.SliceLocation = ds.ImagePositionPatient[2] if 'ImagePositionPatient' in ds else 0.0
 
-        img_array = ds.pixel_array.astype(np.float32)
-
-        # 1. RGB kezelése
-        if img_array.ndim == 3 and img_array.shape[-1] == 3:
-            img_array = np.dot(img_array[..., :3], [0.2989, 0.5870, 0.1140])
-
-        # 2. Dimenziók tisztítása
-        img_array = np.squeeze(img_array)
-
-        # 3. Spacing adatok biztonságos kezelése
-        spacing_x, spacing_y = (1.0, 1.0)
-        if "PixelSpacing" in ds:
-            spacing_x, spacing_y = map(float, ds.PixelSpacing)
-
-        # Több lépcsős fallback a Z spacingre
-        spacing_z = float(getattr(ds, "SliceThickness",
-                                  getattr(ds, "SpacingBetweenSlices", 1.0)))
-        if spacing_z <= 0: spacing_z = 1.0
-
-        img_sitk = sitk.GetImageFromArray(img_array)
-        img_sitk.SetSpacing((spacing_x, spacing_y, spacing_z))
-
-        # Biztonságos alak kinyerése
-        if img_array.ndim == 2:
-            height, width = img_array.shape
-        else:
-            # Ha még mindig több dimenziós lenne, vegyük az utolsó kettőt
-            height, width = img_array.shape[-2], img_array.shape[-1]
+        # Biztonságos alak kinyerése (több dimenzió esetén az utolsó kettő)
+        height, width = image.shape
 
         frame_num = 1
 
-        return ds, img_sitk, img_array, frame_num, width, height, 1
+        return ds, image.sitk, image.pixels, frame_num, width, height, 1
     '''
     def load_file(path):
         """
@@ -100,32 +96,88 @@ class LungSegmenter:
         return ds, img_sitk, img_array, frame_num, width, height, 1
     '''
 
-    def segment_mask(self, img_array):
+    def segment_mask(self, img_array, scale=1):
         """
         Létrehozza a tüdő bináris maszkját a bemeneti képtömb alapján.
 
         A folyamat lépései:
         1. Küszöbölés a megadott HU érték alapján.
         2. Morfológiai zárás (closing) a kisebb rések eltüntetéséhez.
-        3. Régiók címkézése és a legnagyobb összefüggő terület (tüdő) kiválasztása.
-        4. Lyukkitöltés (binary fill holes) a tüdőn belüli erek/daganatok befoglalásához.
+        3. Lyukkitöltés (binary fill holes) a tüdőn belüli erek/daganatok befoglalásához.
+
+        Az eredmény az összes küszöb alatti régiót tartalmazza (a korábbi regionprops alapú
+        rendezés nem szűrt, ezért elmaradt). (N, H, W) bemenetre a segment_masks-ot hívja.
 
         Args:
-            img_array (numpy.ndarray): A CT szelet pixeladatai.
+            img_array (numpy.ndarray): A CT szelet pixeladatai (vagy szeletek kötege).
+            scale (int): Többfelbontású mód lekicsinyítési faktora (lásd segment_masks).
 
         Returns:
             numpy.ndarray: Bináris maszk (0 és 1 értékekkel).
         """
+        img_array = np.asarray(img_array)
+        if img_array.ndim == 3:
+            return self.segment_masks(img_array, scale=scale)
+        return self.segment_masks(img_array[None], scale=scale)[0]
+
+    def segment_masks(self, stack, workers=1, scale=1):
+        """
+        Kötegelt szegmentálás egy (N, H, W) szeletkötegen (pl. egy teljes sorozaton).
+
+        A morfológia és a lyukkitöltés egyetlen hívással fut a teljes kötegen, csak a
+        szeletek síkjában ható struktúraelemekkel, így szeletenként a segment_mask-kal
+        azonos eredményt ad.
+
+        scale > 1 esetén (többfelbontású mód) a szegmentálás a szeletenként scale x scale
+        blokkátlagolt kötegen fut, a nagyított maszk pedig csak a határa körüli sávban
+        finomodik teljes felbontású küszöböléssel (a Dice eltérés a resolution_report-tal mérhető).
+
+        Args:
+            stack (numpy.ndarray): (N, H, W) képköteg.
+            workers (int): Ha > 1, a köteg ennyi részre bontva, szálanként dolgozódik fel.
+            scale (int): Lekicsinyítési faktor (1: teljes felbontás).
+
+        Returns:
+            numpy.ndarray: (N, H, W) uint8 bináris maszkok.
+        """
+        stack = np.asarray(stack)
+        if scale > 1:
+            coarse = self.segment_masks(multires.downsample(stack, scale), workers).astype(bool)
+            return multires.refine(coarse, stack < self.threshold_hu, scale).astype(np.uint8)
+        if workers <= 1 or len(stack) < 2:
+            return self._segment_stack(stack)
+
+        masks = np.empty(stack.shape, dtype=np.uint8)
+
+        def work(bounds):
+            start, end = bounds
+            masks[start:end] = self._segment_stack(stack[start:end])
+
+        edges = np.linspace(0, len(stack), min(workers, len(stack)) + 1).astype(int)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(work, zip(edges[:-1], edges[1:])))
+        return masks
+
+    def resolution_report(self, stack, scales=(2, 4), workers=1):
+        """
+        A többfelbontású módok ideje és Dice eltérése a teljes felbontású maszkhoz képest.
+
+        Returns:
+            list: Faktoronként egy szótár (scale, seconds, speedup, dice, dice_loss).
+        """
+        return multires.resolution_report(
+            lambda s, scale: self.segment_masks(s, workers=workers, scale=scale), stack, scales)
+
+    # Síkbeli struktúraelemek: a szeletek között nincs kapcsolat
+    _CLOSING_FOOTPRINT = morphology.disk(2).astype(bool)[None]
+    _FILL_STRUCTURE = np.pad(ndimage.generate_binary_structure(2, 1)[None], ((1, 1), (0, 0), (0, 0)))
+
+    def _segment_stack(self, stack):
         # Küszöbölés
-        binary_image = np.array(img_array < self.threshold_hu, dtype=np.int8)
-        # Morfológiai műveletek
-        footprint = morphology.disk(2)
-        binary_image = morphology.closing(binary_image, footprint)
-        # Legnagyobb összefüggő terület keresése
-        label_image = measure.label(binary_image)
-        regions = measure.regionprops(label_image)
-        if not regions: return np.zeros_like(img_array, dtype=np.uint8)
-        regions.sort(key=lambda x: x.area, reverse=True)
-        mask = (label_image > 0).astype(np.uint8)
+        binary_image = stack < self.threshold_hu
+        # Zárás: dilatáció, majd erózió a komplementer dilatációjaként. A képen kívüli pixelek
+        # nem erodálnak, ugyanúgy, mint a morphology.closing tükrözéses szélkezelésénél.
+        closed = ndimage.binary_dilation(binary_image, structure=self._CLOSING_FOOTPRINT)
+        closed = ~ndimage.binary_dilation(~closed, structure=self._CLOSING_FOOTPRINT)
         # Lyukak kitöltése a maszkon belül
-        return ndimage.binary_fill_holes(mask).astype(np.uint8)
+        return ndimage.binary_fill_holes(closed, structure=self._FILL_STRUCTURE).astype(np.uint8)
@@ -23,7 +23,6 @@ def run_application():
     try:
         # 1. NEHÉZ IMPORTÁLÁSOK
         import time
-        import pydicom
         import shutil
         import dask
         import pyarrow
@@ -37,7 +36,7 @@ def run_application():
         from src.core.data_manager import DataManager
         from src.core.processing.tumor_processor import TumorProcessor
         from src.core.learning.feature_extractor import FeatureExtractor
-        from src.core.data_prep.annotation_parser import AnnotationParser
+        from src.core.data_prep.patient_store import PatientStore
 
         try:
             from src.core.learning.training_logic import XGBoostTrainer as TrainerClass, DagsHubConnectionError
@@ -51,18 +50,50 @@ def run_application():
             class DagsHubConnectionError(Exception):
                 pass
 
+        # --- 0. Worker a forrásmappák háttérbeli indexeléséhez ---
+
+        class IndexWorker(QThread):
+            progress_signal = pyqtSignal(object)
+            log_signal = pyqtSignal(str)
+            finished = pyqtSignal()
+
+            def __init__(self, mgr):
+                super().__init__()
+                self.mgr = mgr
+                self._stop_requested = False
+                # True, ha az indexelés kivétellel állt le
+                self.failed = False
+
+            def stop(self):
+                """Leállítás kérése; az indexelés a következő csomaghatáron áll meg."""
+                self._stop_requested = True
+
+            def run(self):
+                try:
+                    self.mgr.index_files(progress_callback=self.progress_signal.emit,
+                                         should_stop=lambda: self._stop_requested)
+                except Exception as e:
+                    # Pl. sérült fejléc vagy zárolt index-cache: az eddigi párokkal folytatható
+                    self.failed = True
+                    self.log_signal.emit(f"❌ Hiba a háttérindexelés során: {str(e)}")
+                    traceback.print_exc()
+                finally:
+                    # A GUI csak ebből tudja, hogy az indexelés véget ért (scanning = False)
+                    self.finished.emit()
+
         # --- 1. Worker az indexeléshez ---
 
         class BatchWorker(QThread):
             log_signal = pyqtSignal(str)
             progress_signal = pyqtSignal(int)
-            data_ready_signal = pyqtSignal(dict)
+            data_ready_signal = pyqtSignal(object)
             finished = pyqtSignal()
 
-            def __init__(self, valid_pairs):
+            def __init__(self, mgr):
                 super().__init__()
-                self.valid_pairs = valid_pairs
-                self.patient_store = {}
+                self.mgr = mgr
+                self.valid_pairs = mgr.valid_pairs
+                self.patient_store = None
                 self.log_file = "app.log"
 
             def write_to_log_file(self, message):
@@ -72,37 +103,49 @@ def run_application():
 
             def run(self):
                 total = len(self.valid_pairs)
+                signature = self.mgr.pairs_signature()
+                # Minden XML egyszer kerül feldolgozásra, a közös annotációtárba
+                annotation_store = self.mgr.load_annotations()
+
+                # Változatlan adatoknál a mentett tárat töltjük be (memóriatérképezve)
+                try:
+                    saved = PatientStore.load(self.mgr.store_path, annotation_store)
+                except Exception as e:
+                    saved = None
+                    self.log_signal.emit(f"⚠️ A mentett patient_store nem olvasható: {e}")
+                if saved is not None and saved.signature == signature:
+                    msg = f"♻️ Mentett metaadatok betöltve ({saved.num_slices} szelet, {len(saved)} páciens)."
+                    self.log_signal.emit(msg)
+                    self.write_to_log_file(msg)
+                    self.progress_signal.emit(100)
+                    self.data_ready_signal.emit(saved)
+                    self.finished.emit()
+                    return
+                # A régi (memóriatérképezett) tárat elengedjük, mielőtt a fájljait lecserélnénk
+                saved = None
+
                 msg = f"🚀 Metaadatok indexelése {total} szelethez..."
                 self.log_signal.emit(msg)
                 self.write_to_log_file(msg)
-                for i, (d_path, x_path) in enumerate(self.valid_pairs):
-                    try:
-                        ds_meta = pydicom.dcmread(str(d_path), stop_before_pixels=True)
-                        p_id = ds_meta.PatientID if 'PatientID' in ds_meta else "Ismeretlen"
-                        annotations = AnnotationParser.parse_voc_xml(str(x_path))
-                        slice_meta = {
-                            "patient_id": p_id,
-                            "img_name": os.path.basename(d_path),
-                            "path": str(d_path),
-                            "xml_path": str(x_path),
-                            "width": getattr(ds_meta, 'Rows', 512),
-                            "height": getattr(ds_meta, 'Columns', 512),
-                            "annotations": annotations,
-                            "has_tumor": len(annotations) > 0,
-                            "thickness": float(getattr(ds_meta, 'SliceThickness', 0.0)),
-                            "spacing": getattr(ds_meta, 'PixelSpacing', [1.0, 1.0])
-                        }
-                        if p_id not in self.patient_store:
-                            self.patient_store[p_id] = []
-                        self.patient_store[p_id].append(slice_meta)
-                        if i % 20 == 0 or i == total - 1:
-                            status_msg = f"[{p_id}] Feldolgozva: {os.path.basename(d_path)} ({i + 1}/{total})"
-                            self.log_signal.emit(status_msg)
-                    except Exception as e:
-                        err_msg = f"⚠️ Hiba [{os.path.basename(d_path)}]: {str(e)}"
-                        self.log_signal.emit(err_msg)
-                        self.write_to_log_file(err_msg)
-                    self.progress_signal.emit(int(((i + 1) / total) * 100))
+
+                def on_progress(done, count, p_id, d_path):
+                    if done % 20 == 1 or done == count:
+                        self.log_signal.emit(f"[{p_id}] Feldolgozva: {os.path.basename(d_path)} ({done}/{count})")
+                    self.progress_signal.emit(int(done / count * 100))
+
+                def on_error(d_path, e):
+                    err_msg = f"⚠️ Hiba [{os.path.basename(d_path)}]: {str(e)}"
+                    self.log_signal.emit(err_msg)
+                    self.write_to_log_file(err_msg)
+
+                self.patient_store = self.mgr.build_patient_store(self.valid_pairs, annotation_store,
+                                                                  signature=signature,
+                                                                  progress_callback=on_progress,
+                                                                  error_callback=on_error)
+                try:
+                    self.patient_store.save(self.mgr.store_path)
+                except OSError as e:
+                    self.write_to_log_file(f"⚠️ A patient_store mentése sikertelen: {e}")
                 self.data_ready_signal.emit(self.patient_store)
                 self.finished.emit()
 
@@ -183,6 +226,10 @@ def run_application():
                 self.xml_dir = None
                 self.license_file_path = None  # ÚJ: Licenc fájl tárolója
                 self.mgr = None
+                self.index_worker = None
+                self.scanning = False
+                # Igaz, ha a felhasználó az 1. lépést a háttérindexelés vége előtt indította
+                self.start_after_index = False
                 self.patient_store = None
                 self.log_file = "app.log"
 
@@ -247,6 +294,16 @@ def run_application():
 
                 self.train_btn = PrimaryPushButton(FluentIcon.ROBOT, "4. Model tanítás")
 
+                # Feldolgozási mód (Kapcsoló): alapértelmezetten a processed_data teljes újraépítése
+                self.process_mode_layout = QVBoxLayout()
+                self.fast_mode_switch = SwitchButton()
+                self.fast_mode_switch.setOnText("Gyorsított (cache)")
+                self.fast_mode_switch.setOffText("Teljes újraépítés")
+                self.fast_mode_switch.setChecked(False)
+
+                self.process_mode_layout.addWidget(BodyLabel("Feldolgozási mód:"))
+                self.process_mode_layout.addWidget(self.fast_mode_switch)
+
                 # Gombok tiltása az elején
                 for btn in [self.run_btn, self.process_btn, self.export_btn, self.train_btn]:
                     btn.setEnabled(False)
@@ -257,6 +314,7 @@ def run_application():
                 h_ly.addWidget(self.license_btn)
                 h_ly.addStretch(1)
                 h_ly.addWidget(self.run_btn)
+                h_ly.addLayout(self.process_mode_layout)
                 h_ly.addWidget(self.process_btn)
                 h_ly.addWidget(self.export_btn)
                 h_ly.addSpacing(20)
@@ -269,6 +327,10 @@ def run_application():
                 self.progress_bar = ProgressBar(self)
                 self.layout.addWidget(self.progress_bar)
 
+                # A háttérindexelés állapota (fájlok, párok, sebesség, hátralévő idő)
+                self.index_status = BodyLabel("")
+                self.layout.addWidget(self.index_status)
+
                 # Log ablak
                 self.log_display = QTextEdit()
                 self.log_display.setReadOnly(True)
@@ -311,16 +373,62 @@ def run_application():
 
             def check_ready(self):
                 if self.dicom_dir and self.xml_dir:
-                    self.mgr = DataManager(self.dicom_dir, self.xml_dir)
-                    self.mgr.index_files()
-                    if len(self.mgr.valid_pairs) > 0:
-                        self.run_btn.setEnabled(True)
-                        self.log_display.append(f"✅ Talált párok: {len(self.mgr.valid_pairs)}. Mehet az indexelés!")
+                    # Egy esetleg még futó korábbi indexelés leállítása
+                    if self.index_worker is not None and self.index_worker.isRunning():
+                        self.index_worker.finished.disconnect()
+                        self.index_worker.stop()
+                        self.index_worker.wait()
+                    self.run_btn.setEnabled(False)
+                    self.start_after_index = False
+                    self.progress_bar.setValue(0)
+                    self.log_display.append("🔎 Forrásmappák indexelése a háttérben...")
+
+                    # Párhuzamos fejlécolvasás (I/O-kötött, ezért szálak), külön szálon, hogy a GUI ne fagyjon le
+                    self.mgr = DataManager(self.dicom_dir, self.xml_dir, workers=min(8, os.cpu_count() or 1))
+                    self.index_worker = IndexWorker(self.mgr)
+                    self.index_worker.progress_signal.connect(self.on_scan_progress)
+                    self.index_worker.log_signal.connect(self.log_display.append)
+                    self.index_worker.finished.connect(self.on_scan_finished)
+                    self.scanning = True
+                    self.index_worker.start()
+
+            def on_scan_progress(self, progress):
+                files, total = progress["files"], progress["total"]
+                status = f"📊 {files}/{total if progress['total_known'] else f'~{total}'} fájl | " \
+                         f"{progress['pairs']} pár | {progress['files_per_sec']:.0f} fájl/s"
+                if progress["eta"] is not None:
+                    status += f" | hátralévő idő: ~{progress['eta']:.0f} s"
+                self.index_status.setText(status)
+                if total:
+                    self.progress_bar.setValue(min(100, int(files / total * 100)))
+                # Az 1. lépés már az első párok megtalálásakor indítható
+                if progress["pairs"] > 0 and not self.start_after_index:
+                    self.run_btn.setEnabled(True)
+
+            def on_scan_finished(self):
+                self.scanning = False
+                pairs = len(self.mgr.valid_pairs)
+                state = "hiba" if self.index_worker.failed else "megszakítva" if self.mgr.cancelled else "kész"
+                self.index_status.setText(f"{self.index_status.text()} | {state}")
+                if self.start_after_index:
+                    self.start_after_index = False
+                    self.log_display.append(f"⏹️ Háttérindexelés leállítva, {pairs} párral folytatjuk.")
+                    self.start_index()
+                elif pairs > 0:
+                    self.progress_bar.setValue(100)
+                    self.run_btn.setEnabled(True)
+                    self.log_display.append(f"✅ Talált párok: {pairs}. Mehet az indexelés!")
 
             def start_index(self):
                 self.run_btn.setEnabled(False)
+                # Futó háttérindexelésnél az eddig talált párokkal megyünk tovább
+                if self.scanning:
+                    self.start_after_index = True
+                    self.log_display.append("⏳ Háttérindexelés leállítása az eddigi eredményekkel...")
+                    self.index_worker.stop()
+                    return
                 self.log_display.append("\n--- 1. INDEXELÉS ---")
-                self.worker = BatchWorker(self.mgr.valid_pairs)
+                self.worker = BatchWorker(self.mgr)
                 self.worker.log_signal.connect(self.log_display.append)
                 self.worker.progress_signal.connect(self.progress_bar.setValue)
                 self.worker.data_ready_signal.connect(lambda data: setattr(self, 'patient_store', data))
@@ -335,7 +443,20 @@ def run_application():
             def start_processing(self):
                 self.process_btn.setEnabled(False)
                 self.log_display.append("\n--- 2. FELDOLGOZÁS ---")
-                self.processor = TumorProcessor(self.patient_store)
+                if self.fast_mode_switch.isChecked():
+                    # Lemezes tüdőmaszk- és térfogat-cache (az index mellett), párhuzamos folyamatok,
+                    # és csak a hiányzó/elavult kimenetek újraszámolása
+                    workers = self.mgr.workers or 1
+                    self.log_display.append(
+                        f"⚡ Gyorsított mód: inkrementális kimenet, {workers} folyamat, "
+                        f"cache: {self.mgr.lung_mask_path}, {self.mgr.volume_cache_path}")
+                    self.processor = TumorProcessor(self.patient_store, series_index=self.mgr.series_index,
+                                                    mask_cache_dir=self.mgr.lung_mask_path,
+                                                    volume_cache_dir=self.mgr.volume_cache_path,
+                                                    workers=workers, incremental=True)
+                else:
+                    self.log_display.append("🧱 Teljes újraépítés: a processed_data kiürül, lemezes cache nélkül.")
+                    self.processor = TumorProcessor(self.patient_store, series_index=self.mgr.series_index)
                 self.processor.log_signal.connect(self.log_display.append)
                 self.processor.progress_signal.connect(self.progress_bar.setValue)
                 self.processor.finished.connect(self.on_processing_finished)
@@ -476,6 +597,10 @@ def run_application():
                 setTheme(Theme.DARK)
 
             def closeEvent(self, event):
+                worker = self.dashboard.index_worker
+                if worker is not None and worker.isRunning():
+                    worker.stop()
+                    worker.wait()
                 if hasattr(self.dashboard, 'dask_client') and self.dashboard.dask_client:
                     self.dashboard.dask_client.close()
                 event.accept()
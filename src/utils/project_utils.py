@@ -20,17 +20,25 @@ def class_colors(num_classes):
 
 # --- A TE METÓDUSAID VÁLTOZATLANUL ---
 
-def gvf_snake(image, rectangle_position):
+def gvf_snake(image, rectangle_position, halo=16, draw=True):
     """
     Ez az algoritmus határozza meg a daganat ROI-ját a területen.
+
+    A simítás és a kontúr illesztése csak a ROI körüli ablakban fut (a keret + 3 pixel + halo),
+    a pontok ezután visszakerülnek a teljes kép koordinátáiba. A bemeneti tömb nem módosul.
     :param image: Szürkeárnyalatos opencv kép numpy tömb alakja.
     :param rectangle_position:  Regions of Interest(ROI) pozicó
+    :param halo: Az ablak ráhagyása pixelben (None: a teljes képen fut, a régi módon). A gaussian(3)
+        simítás hatótávja 12 pixel; a teljes képes kontúrtól való eltérést a
+        testing/compare_gvf_snake_window.py méri. Csak headless módban érvényes.
+    :param draw: False esetén headless mód: nem készül szemléltető kép (None-t ad vissza helyette),
+        csak a ROI ablak normalizálódik, és a pontok konverziója vektorizált. True esetén mindig a
+        teljes képen fut (a szemléltető kimenet a régivel megegyezik).
     :return: Illustrative image, Tumor points, ROI points
     """
-    # image = ds.pixel_array.astype('float32')
-    # Let's normalize the image between 0 and 1
-    image -= np.min(image)
-    image /= np.max(image)
+    # Let's normalize the image between 0 and 1 (a min/max mindig a teljes képből)
+    minimum = np.min(image)
+    scale = np.max(image) - minimum
 
     # Initialize the contour
     '''
@@ -46,11 +54,33 @@ def gvf_snake(image, rectangle_position):
     # Initialize the snake with the rectangle coordinates
     init = np.array([rr, cc]).T
 
+    # A ROI ablaka (row, column), a kép határaira vágva
+    if draw or halo is None:
+        top, left = 0, 0
+        window = image
+    else:
+        top, left = max(int(rr.min()) - halo, 0), max(int(cc.min()) - halo, 0)
+        bottom, right = int(rr.max()) + halo + 1, int(cc.max()) + halo + 1
+        window = image[top:bottom, left:right]
+    # Másolaton (a hívó tömbje változatlan marad)
+    window = window - minimum
+    window /= scale
+
     # We execute the GVF Snake algorithm
     # snake = active_contour(image, init, alpha=0.015, beta=10, gamma=0.001), preserve_range=False
-    snake = active_contour(gaussian(image, 3), init, alpha=0.01, beta=3, gamma=0.001)
+    snake = active_contour(gaussian(window, 3), init - (top, left), alpha=0.01, beta=3, gamma=0.001)
+    snake += (top, left)
+
+    if not draw:
+        # (x, y) pontok, egész koordinátákkal
+        init_points = np.ascontiguousarray(init.astype(int)[:, ::-1])
+        snake_points = np.ascontiguousarray(snake.astype(int)[:, ::-1])
+        return None, snake_points, init_points
+
     # We draw the final contour
-    final_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    normalized = image - minimum
+    normalized /= scale
+    final_image = cv2.cvtColor(normalized, cv2.COLOR_GRAY2BGR)
 
     init_array = []
     for point in init.astype(int):
@@ -66,14 +96,18 @@ def gvf_snake(image, rectangle_position):
 
     return final_image, snake_points, init_points
 
-def roi2rect(img_name, img_np, img_data, label_list, image):
+def roi2rect(img_name, img_np, img_data, label_list, image, draw=True):
     """
     Prepare tumor ROI mask and rectangle bounding box.
+
+    draw=False esetén headless mód: nem készül szemléltető másolat és színpaletta,
+    csak a maszk, a keret és a címke.
     """
-    # Másolat, hogy ne írjuk felül az eredeti képet
-    img_vis = img_np.copy()
+    if draw:
+        # Másolat, hogy ne írjuk felül az eredeti képet
+        img_vis = img_np.copy()
 
-    colors = class_colors(len(label_list))
+        colors = class_colors(len(label_list))
 
     # Ha nincs ROI → térjen vissza üres maskkal
     if img_data is None or len(img_data) == 0:
@@ -141,14 +175,14 @@ def roi2rect(img_name, img_np, img_data, label_list, image):
         elif label == 'G':
             label = 'Squamous Cell Carcinoma'
         '''
-        # Szín kiválasztása
-        color = colors[index]
+        if draw:
+            # Szín kiválasztása
+            color = colors[index]
 
-        # Bounding box vizualizáció
-        cv2.rectangle(img_vis, pmin, pmax, color, 1)
+            # Bounding box vizualizáció
+            cv2.rectangle(img_vis, pmin, pmax, color, 1)
 
         # Tumor mask létrehozása
-        mask_tmp = np.zeros_like(image, dtype=np.uint8)
         mask_tmp = cv2.bitwise_and(image, image, mask=roi_mask)
 
         # Final mask-ba rakjuk
@@ -0,0 +1,35 @@
+import os
+import sys
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.lsmc import LSMC
+from src.core.segmentation.lung_segmenter import LungSegmenter
+
+
+def _print_report(title, report):
+    print(title)
+    for row in report:
+        print(f"  {row['scale']}x: {row['seconds'] * 1000:.0f} ms ({row['speedup']:.1f}x) | "
+              f"Dice: {row['dice']:.4f} (veszteség: {row['dice_loss']:.4f})")
+
+
+def run_benchmark(series_dir, scales=(2, 4, 8)):
+    """
+    Többfelbontású (coarse-to-fine) tüdőmaszk módok: idő és Dice eltérés a teljes felbontáshoz képest,
+    az LSMC belső jelölőjére és a LungSegmenter maszkjára.
+    """
+    files = glob.glob(os.path.join(series_dir, "**", "*.dcm"), recursive=True)
+    if not files:
+        print(f"❌ Nem található DICOM fájl: {series_dir}")
+        return
+    lsmc = LSMC()
+    volume, _ = lsmc.load_series(files)
+    print(f"🔍 {len(volume)} szelet: {series_dir}")
+    _print_report("LSMC.internal_markers (hu=-400):", lsmc.resolution_report(volume, scales=scales))
+    _print_report("LungSegmenter.segment_masks:", LungSegmenter().resolution_report(volume, scales=scales))
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/DICOM")
@@ -0,0 +1,59 @@
+import os
+import sys
+import glob
+import time
+import numpy as np
+from scipy import ndimage
+from skimage import measure, morphology
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.lsmc import LSMC
+from src.core.segmentation.lung_segmenter import LungSegmenter
+
+
+def legacy_segment_mask(img_array, threshold_hu=-320):
+    """A LungSegmenter.segment_mask korábbi, szeletenkénti változata, referenciának."""
+    binary_image = np.array(img_array < threshold_hu, dtype=np.int8)
+    binary_image = morphology.closing(binary_image, morphology.disk(2))
+    label_image = measure.label(binary_image)
+    regions = measure.regionprops(label_image)
+    if not regions: return np.zeros_like(img_array, dtype=np.uint8)
+    regions.sort(key=lambda x: x.area, reverse=True)
+    mask = (label_image > 0).astype(np.uint8)
+    return ndimage.binary_fill_holes(mask).astype(np.uint8)
+
+
+def run_benchmark(series_dir, workers=4):
+    """
+    Egy teljes sorozat maszkolása: szeletenkénti régi segment_mask vs. kötegelt segment_masks.
+
+    Kiírja az egy szeletre és a teljes sorozatra eső időt, és ellenőrzi a bitre azonos eredményt.
+    """
+    files = glob.glob(os.path.join(series_dir, "**", "*.dcm"), recursive=True)
+    if not files:
+        print(f"❌ Nem található DICOM fájl: {series_dir}")
+        return
+    volume, _ = LSMC().load_series(files)
+    segmenter = LungSegmenter()
+    print(f"🔍 {len(volume)} szelet: {series_dir}")
+
+    start = time.perf_counter()
+    legacy_segment_mask(volume[0])
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = np.stack([legacy_segment_mask(image) for image in volume])
+    legacy = time.perf_counter() - start
+    print(f"Régi, szeletenként: {legacy:.2f} s ({single * 1000:.1f} ms egy szelet)")
+
+    for n in (1, workers):
+        start = time.perf_counter()
+        masks = segmenter.segment_masks(volume, workers=n)
+        elapsed = time.perf_counter() - start
+        print(f"segment_masks ({n} szál): {elapsed:.2f} s = {elapsed / single:.1f} x egy régi szelet "
+              f"({legacy / elapsed:.1f}x) | egyezik: {np.array_equal(masks, expected)}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/DICOM")
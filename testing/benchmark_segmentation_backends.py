@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.data_manager import DataManager
+from src.core.lsmc import LSMC
+from src.core.segmentation.backends import get_backend
+from src.core.segmentation.multires import dice
+
+# Mért konfigurációk: (címke, backend név, konstruktor paraméterek); az első a referencia
+CONFIGS = [
+    ("lsmc", "lsmc", {}),
+    ("lsmc x2", "lsmc", {"scale": 2}),
+    ("lsmc x4", "lsmc", {"scale": 4}),
+    ("threshold", "threshold", {}),
+    ("threshold x2", "threshold", {"scale": 2}),
+]
+
+
+def _peak_rss_mb():
+    """A folyamat csúcs memóriahasználata (MB)."""
+    try:
+        import resource
+        # Linuxon kB, macOS-en bájt
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def _run_backend(series, name, options):
+    """
+    Egy backend futtatása külön folyamatban (így a csúcs memória csak rá vonatkozik), sorozatonként.
+
+    Returns:
+        tuple: ([(bitpakolt maszkok, szélesség, idő s), ...] sorozatonként, csúcs memória MB).
+    """
+    lsmc = LSMC()
+    backend = get_backend(name, **options)
+    results = []
+    for uid, paths in series:
+        # A sorozat-index térbeli sorrendje marad
+        volume, _ = lsmc.load_series(paths, sort=False, series_uid=uid)
+        start = time.perf_counter()
+        masks = backend.segment_volume(volume)
+        elapsed = time.perf_counter() - start
+        results.append((np.packbits(masks, axis=-1), masks.shape[-1], elapsed))
+    return results, _peak_rss_mb()
+
+
+def sample_series(dicom_dir, max_series=5):
+    """
+    Mintasorozatok a korpuszból: a DICOM fejlécek indexelése (DataManager, lemezes cache nélkül),
+    majd az első max_series sorozat fájljai térbeli sorrendben.
+
+    Returns:
+        list: [(SeriesInstanceUID, [útvonal, ...]), ...]
+    """
+    mgr = DataManager(dicom_dir, dicom_dir, use_cache=False)
+    mgr.index_files()
+    if mgr.series_index is None:
+        return []
+    uids = list(mgr.series_index.series)[:max_series]
+    return [(uid, mgr.series_index.paths(uid)) for uid in uids]
+
+
+def run_benchmark(dicom_dir, configs=CONFIGS, min_dice=0.95, max_series=5):
+    """
+    Szegmentáló backendek összevetése egy mintakorpuszon: ms/szelet, csúcs memória és a maszkok
+    Dice egyezése az első (referencia) konfigurációval.
+
+    Minden sorozat külön térfogatként fut (a különböző páciensek és képméretek nem keverednek);
+    a jelentés az összesített ms/szeletet és a sorozatonkénti Dice átlagát adja. A végén a
+    leggyorsabb olyan backendet ajánlja, amelynek átlagos Dice értéke eléri a min_dice küszöböt.
+    """
+    series = sample_series(dicom_dir, max_series)
+    if not series:
+        print(f"❌ Nem található DICOM sorozat: {dicom_dir}")
+        return
+    total_slices = sum(len(paths) for _, paths in series)
+    print(f"🔍 {len(series)} sorozat, {total_slices} szelet: {dicom_dir}")
+
+    reference = None
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for label, name, options in configs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            per_series, peak = pool.submit(_run_backend, series, name, options).result()
+        masks = [np.unpackbits(packed, axis=-1, count=width).astype(bool) for packed, width, _ in per_series]
+        if reference is None:
+            reference = masks
+        score = float(np.mean([dice(m, r) for m, r in zip(masks, reference)]))
+        ms_per_slice = sum(elapsed for _, _, elapsed in per_series) * 1000 / total_slices
+        results.append((label, ms_per_slice, score))
+        print(f"  {label:<14} {ms_per_slice:8.1f} ms/szelet | csúcs memória: {peak:7.1f} MB | "
+              f"átlagos Dice: {score:.4f}")
+
+    eligible = [r for r in results if r[2] >= min_dice]
+    if eligible:
+        label, ms_per_slice, score = min(eligible, key=lambda r: r[1])
+        print(f"✅ Ajánlott (Dice >= {min_dice}): {label} ({ms_per_slice:.1f} ms/szelet, Dice {score:.4f})")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/DICOM",
+                  min_dice=float(sys.argv[2]) if len(sys.argv) > 2 else 0.95,
+                  max_series=int(sys.argv[3]) if len(sys.argv) > 3 else 5)
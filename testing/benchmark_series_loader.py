@@ -0,0 +1,63 @@
+import os
+import sys
+import glob
+import time
+import tracemalloc
+import numpy as np
+import pydicom
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.lsmc import LSMC
+
+
+def legacy_get_pixels_hu(scans):
+    """A korábbi get_pixels_hu: np.stack, float64 köztes tömb, csak az első szelet rescale értékei."""
+    image = np.stack([s.pixel_array for s in scans]).astype(np.int16)
+    image[image == -2000] = 0
+    intercept = scans[0].RescaleIntercept
+    slope = scans[0].RescaleSlope
+    if slope != 1:
+        image = (slope * image.astype(np.float64)).astype(np.int16)
+    image += np.int16(intercept)
+    return np.array(image, dtype=np.int16)
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_benchmark(series_dir, workers=8):
+    """
+    Egy sorozat betöltése: LSMC.load_scans + régi get_pixels_hu vs. párhuzamos LSMC.load_series.
+
+    Kiírja a betöltési időt és a csúcsmemóriát, és ellenőrzi, hogy a HU értékek egyeznek-e
+    (egységes rescale esetén bitre azonosnak kell lenniük).
+    """
+    files = glob.glob(os.path.join(series_dir, "**", "*.dcm"), recursive=True)
+    if not files:
+        print(f"❌ Nem található DICOM fájl: {series_dir}")
+        return
+    lsmc = LSMC(load_workers=workers)
+    print(f"🔍 {len(files)} szelet: {series_dir}")
+
+    legacy, legacy_time, legacy_peak = _measure(lambda: legacy_get_pixels_hu(lsmc.load_scans(files)))
+    (volume, _), new_time, new_peak = _measure(lambda: lsmc.load_series(files))
+
+    print(f"Régi (load_scans + get_pixels_hu): {legacy_time:.2f} s, csúcs {legacy_peak / 1024 ** 2:.0f} MB")
+    print(f"load_series ({workers} szál): {new_time:.2f} s, csúcs {new_peak / 1024 ** 2:.0f} MB "
+          f"({legacy_time / new_time:.1f}x)")
+    headers = [pydicom.dcmread(f, stop_before_pixels=True) for f in files]
+    mixed = len({(float(s.RescaleSlope), float(s.RescaleIntercept)) for s in headers}) > 1
+    print(f"Vegyes rescale: {mixed} | HU egyezik (InstanceNumber = pozíció sorrend esetén): "
+          f"{np.array_equal(legacy, volume)}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/DICOM")
@@ -0,0 +1,98 @@
+import os
+import sys
+import glob
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.data_prep.dicom_slice import DicomSlice
+from src.core.processing.slice_context import SliceContext
+from src.core.data_prep.processed_slice import PLANES, ProcessedSlice, save_processed
+from src.core.segmentation.lung_segmenter import LungSegmenter
+
+
+def _polygons(shape):
+    """Egy rögzített daganat- és ROI-poligon a kép közepén ((x, y) pontok)."""
+    h, w = shape
+    roi = np.array([[w // 3, h // 3], [2 * w // 3, h // 3], [2 * w // 3, 2 * h // 3], [w // 3, 2 * h // 3]])
+    tumor = np.array([[w // 2, h // 3 + 5], [2 * w // 3 - 5, h // 2], [w // 2, 2 * h // 3 - 5], [w // 3 + 5, h // 2]])
+    return tumor, roi
+
+
+def legacy_slice(path, out_path):
+    """A TumorProcessor korábbi szeletenkénti lépései: külön dekódolás, négy teljes float32 sík mentése."""
+    origin_img = LungSegmenter.load_file(path, mode="pixels").astype('float32', copy=False)
+    snake_points, roi_points = _polygons(origin_img.shape)
+    final_tumor_mask = np.zeros(origin_img.shape, dtype='uint8')
+    cv2.fillPoly(final_tumor_mask, pts=[snake_points], color=255)
+    masked_tumor = np.where(final_tumor_mask > 0, origin_img, 0).astype('float32')
+    roi_mask = np.zeros(origin_img.shape, dtype='uint8')
+    cv2.fillPoly(roi_mask, pts=[roi_points], color=255)
+    inverse_roi_mask = cv2.subtract(roi_mask, final_tumor_mask)
+    inverted_masked_roi = np.where(inverse_roi_mask > 0, origin_img, 0).astype('float32')
+    lung_mask = DicomSlice(path).hu() < -400
+    segmented_parenchyma = (lung_mask * origin_img).astype('float32')
+    np.savez_compressed(out_path, original=origin_img, parenchyma=segmented_parenchyma,
+                        masked_tumor=masked_tumor, inverted_roi=inverted_masked_roi, label="A", patient_id="P")
+
+
+def context_slice(path, out_path, buffers):
+    """Ugyanezek a lépések a mostani úton: SliceContext (egy dekódolás, újrahasznosított pufferek) és save_processed."""
+    context = SliceContext(path, buffers=buffers)
+    snake_points, roi_points = _polygons(context.image.shape)
+    tumor_mask, roi_mask = context.tumor_masks(snake_points, roi_points)
+    save_processed(out_path, original=context.image, label="A", patient_id="P",
+                   tumor_mask=tumor_mask, roi_mask=roi_mask, lung_mask=context.hu() < -400)
+    return context.buffers
+
+
+def run_benchmark(series_dir):
+    """
+    Szeletenkénti dekódolás, maszkolás és mentés: a régi lépések (négy float32 sík) vs.
+    SliceContext + save_processed.
+
+    Kiírja az egy szeletre eső időt, a tracemalloc szerinti csúcs foglalást és a fájlméretet, és
+    ellenőrzi, hogy a ProcessedSlice által visszaállított síkok bitre azonosak a régiekkel.
+    """
+    files = sorted(glob.glob(os.path.join(series_dir, "**", "*.dcm"), recursive=True))
+    if not files:
+        print(f"❌ Nem található DICOM fájl: {series_dir}")
+        return
+    print(f"🔍 {len(files)} szelet: {series_dir}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_out, compact_out = os.path.join(tmp, "legacy.npz"), os.path.join(tmp, "compact.npz")
+        buffers = None
+        for path in files:
+            legacy_slice(path, legacy_out)
+            buffers = context_slice(path, compact_out, buffers)
+            with np.load(legacy_out) as expected, ProcessedSlice(compact_out) as data:
+                assert all(np.array_equal(expected[key].view(np.uint32), data[key].view(np.uint32))
+                           for key in PLANES)
+        print("✅ A visszaállított síkok bitre azonosak.")
+
+        for name, step, out_path in (("Régi", lambda path: legacy_slice(path, legacy_out), legacy_out),
+                                     ("SliceContext", lambda path: context_slice(path, compact_out, buffers),
+                                      compact_out)):
+            start = time.perf_counter()
+            for path in files:
+                step(path)
+            elapsed = (time.perf_counter() - start) * 1000 / len(files)
+
+            peak = 0
+            for path in files:
+                tracemalloc.start()
+                step(path)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            size = os.path.getsize(out_path) / 1024
+            print(f"  {name:<13} {elapsed:6.1f} ms/szelet | csúcs foglalás: {peak / 1024 / 1024:6.2f} MB"
+                  f" | utolsó fájl: {size:6.0f} KB")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/DICOM")
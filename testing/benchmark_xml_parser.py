@@ -0,0 +1,55 @@
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.annotation_handler import AnnotationHandler
+from src.core.data_prep.annotation_parser import AnnotationParser
+
+
+def run_benchmark(xml_dir, workers=8):
+    """
+    A régi (fájlonkénti ElementTree) és az új kötegelt XML feldolgozás összehasonlítása.
+
+    Ellenőrzi, hogy a kötegelt feldolgozás ugyanazt adja-e, mint az AnnotationParser.parse_voc_xml
+    (nyers nézet) és az AnnotationHandler.parse_xml (szűrt nézet), majd kiírja az áteresztőképességet.
+    """
+    files = glob.glob(os.path.join(xml_dir, "**", "*.xml"), recursive=True)
+    if not files:
+        print(f"❌ Nem található XML fájl: {xml_dir}")
+        return
+    print(f"🔍 {len(files)} XML fájl: {xml_dir}")
+
+    # 1. Referencia: a jelenlegi ElementTree út
+    start = time.perf_counter()
+    reference = [AnnotationParser.parse_voc_xml(f) for f in files]
+    baseline = time.perf_counter() - start
+    print(f"ElementTree (parse_voc_xml): {baseline:.2f} s ({len(files) / baseline:.0f} fájl/s)")
+
+    expected = [[(o["label"],) + tuple(o["bbox"]) for o in objs] for objs in reference]
+
+    # 2. Kötegelt feldolgozás különböző módokban
+    for executor, n in (("thread", 1), ("thread", workers), ("process", workers)):
+        start = time.perf_counter()
+        results = AnnotationParser.parse_voc_batch(files, workers=n, executor=executor)
+        elapsed = time.perf_counter() - start
+        same = [objs for objs, _ in results] == expected
+        print(f"parse_voc_batch ({executor}, {n} munkás): {elapsed:.2f} s "
+              f"({len(files) / elapsed:.0f} fájl/s, {baseline / elapsed:.1f}x) | egyezik: {same}")
+
+    # 3. Szűrt nézet (ismeretlen címke, hibás box) az AnnotationHandler szabályaival
+    handler = AnnotationHandler()
+    filtered = AnnotationParser.parse_voc_batch(files, workers=workers, label_map=handler.label_map)
+    mismatches = 0
+    for f, (objs, ok) in zip(files, filtered):
+        boxes, _ = handler.parse_xml(f)
+        count = 0 if boxes is None else len(boxes)
+        if ok and count != len(objs):
+            mismatches += 1
+    print(f"Szűrt nézet eltérések az AnnotationHandler-hez képest: {mismatches}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/ANNOTATION")
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.processing.output_manifest import OutputManifest
+
+
+def run_check():
+    """
+    Az OutputManifest elavult kimeneteinek kezelése.
+
+    Egy korábban mentett szelet újraszámoláskor kihagyottá (nincs érvényes ROI) vagy hibássá
+    válik: a régi .npz nem maradhat a kimeneti mappában, és a jegyzék sem jelölheti naprakésznek.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        dicom, xml = tmp / "slice.dcm", tmp / "slice.xml"
+        dicom.write_bytes(b"DICM")
+        xml.write_text("<annotation/>", encoding="utf-8")
+        slice_data = {"path": str(dicom), "xml_path": str(xml)}
+        output_dir = tmp / "processed_data"
+        output_dir.mkdir()
+        name = "P1_slice.dcm.npz"
+        output = output_dir / name
+
+        # 1) Első futás: a szelet mentve
+        manifest = OutputManifest(output_dir)
+        inputs = OutputManifest.fingerprint(slice_data, "v2")
+        output.write_bytes(b"npz")
+        manifest.record(name, inputs, True)
+        manifest.save()
+        assert OutputManifest(output_dir).is_current(name, inputs)
+
+        # 2) Megváltozott annotáció: elavult, a régi kimenet törlődik az újraszámolás előtt
+        xml.write_text("<annotation><object/></annotation>", encoding="utf-8")
+        manifest = OutputManifest(output_dir)
+        changed = OutputManifest.fingerprint(slice_data, "v2")
+        assert not manifest.is_current(name, changed)
+        manifest.discard(name)
+        assert not output.exists() and name not in manifest.entries
+
+        # 3) Mentettből kihagyott: a régi .npz törlődik, a bejegyzés naprakész
+        output.write_bytes(b"npz")
+        manifest.record(name, changed, True)
+        manifest.record(name, changed, False)
+        manifest.save()
+        assert not output.exists()
+        assert OutputManifest(output_dir).is_current(name, changed)
+
+        # 4) Kihagyott bejegyzés mellett (kívülről) megjelent .npz: nem naprakész
+        output.write_bytes(b"npz")
+        assert not OutputManifest(output_dir).is_current(name, changed)
+
+        # 5) Sorozatmaszk: egy szomszédos szelet hozzáadása vagy átrendezése elavulttá teszi
+        neighbour = tmp / "neighbour.dcm"
+        neighbour.write_bytes(b"DICM")
+        series = OutputManifest.series_digest([dicom])
+        manifest = OutputManifest(output_dir)
+        manifest.record(name, OutputManifest.fingerprint(slice_data, "v2", series), True)
+        output.write_bytes(b"npz")
+        for paths in ([dicom, neighbour], [neighbour, dicom]):
+            inputs = OutputManifest.fingerprint(slice_data, "v2", OutputManifest.series_digest(paths))
+            assert not manifest.is_current(name, inputs)
+    print("✅ OutputManifest: az elavult kimenetek felismerhetők és törlődnek.")
+
+
+if __name__ == "__main__":
+    run_check()
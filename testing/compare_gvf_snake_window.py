@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.data_manager import DataManager
+from src.core.data_prep.annotation_parser import parse_voc_objects
+from src.core.data_prep.dicom_slice import DicomSlice
+import src.utils.project_utils as project_utils
+
+# A roi2rect címkelistája (a TumorProcessor sorrendjében)
+LABELS = ['A', 'B', 'G', 'D']
+
+
+def _tumor_mask(image, objects):
+    """A feldolgozás 2-3. lépése: ROI maszk és keret a szelet annotációiból (mint a SliceProcessor)."""
+    img_data = [[xmin, ymin, xmax, ymax] + [int(name == label) for label in LABELS]
+                for name, xmin, ymin, xmax, ymax in objects]
+    mask, roi_pos, _ = project_utils.roi2rect(img_name="", img_np=image, img_data=img_data,
+                                              label_list=LABELS, image=image, draw=False)
+    return mask, roi_pos
+
+
+def run_comparison(dicom_dir, annotation_dir, max_slices=20, halos=(8, 16, 32)):
+    """
+    A gvf_snake ROI-ablakos (halo) és teljes képes (halo=None) kontúrjának összevetése mintaszeleteken.
+
+    Mindkét változat ugyanabból a kezdőkontúrból indul, így a pontok sorszám szerint párosíthatók;
+    szeletenként a legnagyobb pont-eltérést (pixel) veszi, és ezek maximumát, átlagát, valamint
+    a futásidőket jelenti haloként.
+    """
+    mgr = DataManager(dicom_dir, annotation_dir, use_cache=False)
+    mgr.index_files()
+    samples = []
+    for dicom_path, xml_path in mgr.valid_pairs:
+        objects, ok = parse_voc_objects(xml_path)
+        if ok and objects:
+            samples.append((dicom_path, objects))
+        if len(samples) >= max_slices:
+            break
+    if not samples:
+        print(f"❌ Nem található annotált szelet: {dicom_dir}")
+        return
+    print(f"🔍 {len(samples)} annotált szelet: {dicom_dir}")
+
+    reference = []
+    start = time.perf_counter()
+    for dicom_path, objects in samples:
+        mask, roi_pos = _tumor_mask(DicomSlice(dicom_path).pixels.astype(np.float32), objects)
+        _, snake, _ = project_utils.gvf_snake(mask, roi_pos, halo=None, draw=False)
+        reference.append((mask, roi_pos, snake))
+    full = time.perf_counter() - start
+    print(f"  teljes kép    {full * 1000 / len(samples):8.1f} ms/szelet")
+
+    for halo in halos:
+        deviations = []
+        start = time.perf_counter()
+        for mask, roi_pos, expected in reference:
+            _, snake, _ = project_utils.gvf_snake(mask, roi_pos, halo=halo, draw=False)
+            deviations.append(float(np.max(np.hypot(*(snake - expected).T))))
+        elapsed = time.perf_counter() - start
+        print(f"  halo={halo:<4}     {elapsed * 1000 / len(samples):8.1f} ms/szelet | "
+              f"max eltérés: {max(deviations):.1f} px | átlagos max eltérés: {np.mean(deviations):.2f} px")
+
+
+if __name__ == "__main__":
+    run_comparison(sys.argv[1] if len(sys.argv) > 1 else "Data/Train/DICOM",
+                   sys.argv[2] if len(sys.argv) > 2 else "Data/Train/ANNOTATION",
+                   max_slices=int(sys.argv[3]) if len(sys.argv) > 3 else 20)